@@ -2,10 +2,20 @@
 Custom QApplication subclass for the Pythom DAG diagram editor.
 """
 import json
+import functools
 from typing import Dict, List, Any
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QUndoStack, QUndoCommand
 
+# Only the most recent commands are written to session files
+_MAX_SERIALIZED_COMMANDS = 50
+
+
+@functools.lru_cache(maxsize=1)
+def undo_stack():
+    """Return the running application's undo stack, looked up once per process."""
+    return QApplication.instance().undo_stack
+
 
 class App(QApplication):
     """Custom application class with undo/redo support."""
@@ -29,17 +39,20 @@ class App(QApplication):
         """Serialize the undo stack to a list of dictionaries."""
         stack_data = []
         
-        for i in range(self.undo_stack.count()):
+        # Keep the newest commands only; indices are relative to the first kept one
+        first = max(0, self.undo_stack.count() - _MAX_SERIALIZED_COMMANDS)
+        for i in range(first, self.undo_stack.count()):
             command = self.undo_stack.command(i)
             if command:
                 command_data = self._serialize_command(command)
                 if command_data:
                     stack_data.append(command_data)
         
+        clean_index = self.undo_stack.cleanIndex()
         return {
             'commands': stack_data,
-            'clean_index': self.undo_stack.cleanIndex(),
-            'current_index': self.undo_stack.index()
+            'clean_index': clean_index - first if clean_index >= first else -1,
+            'current_index': max(0, self.undo_stack.index() - first)
         }
     
     def _serialize_command(self, command: QUndoCommand) -> Dict[str, Any]:
@@ -81,9 +94,8 @@ class App(QApplication):
         
         # Store common attributes that most commands have
         if hasattr(command, 'obj') and command.obj:
-            # Store object reference info
-            if hasattr(command.obj, 'get_text'):
-                data['obj_text'] = command.obj.get_text()
+            # Refer to the object by the id its scene data is saved under
+            data['obj_id'] = id(command.obj)
             if hasattr(command.obj, 'pos'):
                 pos = command.obj.pos()
                 data['obj_pos'] = {'x': pos.x(), 'y': pos.y()}
@@ -12,6 +12,20 @@ from pathlib import Path
 from PyQt6.QtCore import QSettings, QByteArray
 from PyQt6.QtWidgets import QMainWindow, QApplication
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_json(data, pretty: bool = False) -> bytes:
+    """Encode data as UTF-8 JSON, compact unless pretty, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else None)
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
 
 class SessionManager:
     """Manages session persistence using QSettings and JSON/pickle serialization."""
@@ -27,8 +41,12 @@ class SessionManager:
         # Current session file
         self.current_session_file = None
     
-    def save_window_state(self, window: QMainWindow, window_id: str = "main"):
-        """Save window geometry, position, and state to QSettings."""
+    def save_window_state(self, window: QMainWindow, window_id: str = "main", sync: bool = True):
+        """Save window geometry, position, and state to QSettings.
+        
+        With sync=False the values are left for QSettings to write out from
+        the event loop, instead of blocking on the disk here.
+        """
         self.settings.beginGroup(f"window_{window_id}")
         
         # Save geometry and position
@@ -43,7 +61,8 @@ class SessionManager:
             self.settings.setValue("size", window.size())
         
         self.settings.endGroup()
-        self.settings.sync()
+        if sync:
+            self.settings.sync()
     
     def restore_window_state(self, window: QMainWindow, window_id: str = "main") -> bool:
         """Restore window geometry, position, and state from QSettings."""
@@ -78,6 +97,15 @@ class SessionManager:
         self.settings.endGroup()
         return success
     
+    def get_opengl_viewport(self) -> bool:
+        """Whether diagram views should render through OpenGL; off unless enabled."""
+        return self.settings.value("openGLViewport", False, bool)
+    
+    def set_opengl_viewport(self, enabled: bool):
+        """Remember whether diagram views should render through OpenGL."""
+        self.settings.setValue("openGLViewport", enabled)
+        self.settings.sync()
+    
     def save_application_data(self, windows_data: List[Dict[str, Any]], undo_stack_data: Dict[str, Any] = None) -> str:
         """Save application data including undo stack to JSON file and update QSettings."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -98,9 +126,11 @@ class SessionManager:
                 "undo_stack": undo_stack_data or {}
             }
             
-            # Save as JSON (preferred for readability and portability)
-            with open(session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, indent=2, ensure_ascii=False)
+            # Save as JSON (preferred for readability and portability); encoding
+            # up front means a failed encode leaves no partial file behind
+            encoded = dumps_json(session_data)
+            with open(session_file, 'wb') as f:
+                f.write(encoded)
             
             # Update QSettings with latest session file
             self.settings.setValue("lastSessionFile", str(session_file))
@@ -165,20 +195,31 @@ class SessionManager:
     
     def serialize_diagram_scene(self, scene) -> Dict[str, Any]:
         """Serialize a DiagramScene to a dictionary."""
+        # Reuse the last result while the scene is unchanged
+        cached = getattr(scene, '_serialized', None)
+        if cached is not None and cached[0] == scene._change_counter:
+            return cached[1]
+        
         try:
             # Get all items in the scene
             objects = []
             arrows = []
+            # Objects of equal size share one size dict (most have the default size)
+            sizes = {}
             
             for item in scene.items():
                 # Check if it's an object node
                 if hasattr(item, 'get_text') and not hasattr(item, 'get_source'):
+                    rect = item.boundingRect()
+                    size_key = (rect.width(), rect.height())
+                    size = sizes.get(size_key)
+                    if size is None:
+                        size = sizes[size_key] = {'width': size_key[0], 'height': size_key[1]}
                     objects.append({
                         'id': id(item),
                         'text': item.get_text(),
                         'position': {'x': item.pos().x(), 'y': item.pos().y()},
-                        'size': {'width': item.boundingRect().width(), 
-                                'height': item.boundingRect().height()}
+                        'size': size
                     })
                 
                 # Check if it's an arrow
@@ -200,7 +241,7 @@ class SessionManager:
                         'is_inclusion': getattr(item, '_is_inclusion', False)  # Save inclusion property
                     })
             
-            return {
+            data = {
                 'objects': objects,
                 'arrows': arrows,
                 'scene_rect': {
@@ -210,6 +251,9 @@ class SessionManager:
                     'height': scene.sceneRect().height()
                 }
             }
+            if hasattr(scene, '_serialized'):
+                scene._serialized = (scene._change_counter, data)
+            return data
         
         except Exception as e:
             print(f"Error serializing diagram scene: {e}")
@@ -226,8 +270,9 @@ class SessionManager:
             
             filepath = self.data_dir / filename
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(diagram_data, f, indent=2, ensure_ascii=False)
+            encoded = dumps_json(diagram_data)
+            with open(filepath, 'wb') as f:
+                f.write(encoded)
             
             return True
         
@@ -292,7 +337,7 @@ class SessionManager:
             return {
                 'window_id': str(id(main_window)),
                 'diagrams': diagrams,
-                'settings': main_window.diagram_settings if hasattr(main_window, 'diagram_settings') else {}
+                'settings': main_window.diagram_settings.to_dict() if hasattr(main_window, 'diagram_settings') else {}
             }
         
         except Exception as e:
@@ -58,6 +58,10 @@ class RenameObject(QUndoCommand):
     def undo(self):
         """Undo the rename."""
         self.obj.set_base_name(self.old_name)
+    
+    def serialize(self):
+        """Return the rename as plain data."""
+        return {'obj_id': id(self.obj), 'old_name': self.old_name, 'new_name': self.new_name}
 
 
 class RenameArrow(QUndoCommand):
@@ -142,6 +146,14 @@ class MoveObject(QUndoCommand):
     def undo(self):
         """Undo the move."""
         self.obj.setPos(self.old_position)
+    
+    def serialize(self):
+        """Return the move as plain data."""
+        return {
+            'obj_id': id(self.obj),
+            'old_pos': {'x': self.old_position.x(), 'y': self.old_position.y()},
+            'new_pos': {'x': self.new_position.x(), 'y': self.new_position.y()}
+        }
 
 
 class PlaceObject(QUndoCommand):
@@ -1,6 +1,8 @@
 """
 Diagram Settings dialog for configuring diagram appearance and behavior.
 """
+from dataclasses import dataclass, field, fields, asdict
+
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTabWidget,
                              QWidget, QLabel, QSpinBox, QDoubleSpinBox,
                              QColorDialog, QPushButton, QGroupBox, QFormLayout,
@@ -9,6 +11,52 @@ from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QColor, QPalette, QIcon
 
 
+@dataclass
+class DiagramSettings:
+    """Diagram appearance and behavior settings, read by attribute."""
+    
+    # Appearance
+    bg_color: QColor = field(default_factory=lambda: QColor(255, 255, 255))
+    selection_color: QColor = field(default_factory=lambda: QColor(255, 165, 0))
+    font_size: int = 14
+    text_color: QColor = field(default_factory=lambda: QColor(0, 0, 0))
+    
+    # Grid
+    grid_spacing: int = 150
+    show_grid: bool = False
+    grid_color: QColor = field(default_factory=lambda: QColor(200, 200, 200))
+    grid_width: float = 1.0
+    snap_to_grid: bool = True
+    auto_grid_spacing: bool = True
+    
+    # Objects
+    obj_border_color: QColor = field(default_factory=lambda: QColor(0, 0, 0))
+    obj_fill_color: QColor = field(default_factory=lambda: QColor(0, 0, 0, 0))
+    obj_border_width: float = 0.0
+    corner_radius: int = 10
+    min_width: int = 80
+    min_height: int = 80
+    obj_padding: int = 10
+    
+    # Arrows
+    arrow_color: QColor = field(default_factory=lambda: QColor(100, 100, 100))
+    arrow_width: float = 2.0
+    arrow_head_size: int = 15
+    arrow_head_angle: int = 30
+    curve_intensity: int = 30
+    self_loop_radius: int = 50
+    
+    def to_dict(self):
+        """Return the settings as a plain dictionary (the session format)."""
+        return asdict(self)
+    
+    def update(self, values):
+        """Set settings from a dictionary, ignoring unknown keys."""
+        for f in fields(self):
+            if f.name in values:
+                setattr(self, f.name, values[f.name])
+
+
 class ColorButton(QPushButton):
     """Custom button for color selection."""
     
@@ -364,92 +412,69 @@ class DiagramSettingsDialog(QDialog):
         self.self_loop_radius_spin.setValue(50)
     
     def get_settings(self):
-        """Get all current settings as a dictionary."""
-        return {
+        """Get all current settings as a DiagramSettings."""
+        return DiagramSettings(
             # Appearance
-            'bg_color': self.bg_color_button.get_color(),
-            'selection_color': self.selection_color_button.get_color(),
-            'font_size': self.font_size_spin.value(),
-            'text_color': self.text_color_button.get_color(),
+            bg_color=self.bg_color_button.get_color(),
+            selection_color=self.selection_color_button.get_color(),
+            font_size=self.font_size_spin.value(),
+            text_color=self.text_color_button.get_color(),
             
             # Grid
-            'grid_spacing': self.grid_spacing_spin.value(),
-            'show_grid': self.show_grid_check.isChecked(),
-            'grid_color': self.grid_color_button.get_color(),
-            'grid_width': self.grid_width_spin.value(),
-            'snap_to_grid': self.snap_to_grid_check.isChecked(),
-            'auto_grid_spacing': self.auto_grid_spacing_check.isChecked(),
+            grid_spacing=self.grid_spacing_spin.value(),
+            show_grid=self.show_grid_check.isChecked(),
+            grid_color=self.grid_color_button.get_color(),
+            grid_width=self.grid_width_spin.value(),
+            snap_to_grid=self.snap_to_grid_check.isChecked(),
+            auto_grid_spacing=self.auto_grid_spacing_check.isChecked(),
             
             # Objects
-            'obj_border_color': self.obj_border_color_button.get_color(),
-            'obj_fill_color': self.obj_fill_color_button.get_color(),
-            'obj_border_width': self.obj_border_width_spin.value(),
-            'corner_radius': self.corner_radius_spin.value(),
-            'min_width': self.min_width_spin.value(),
-            'min_height': self.min_height_spin.value(),
-            'obj_padding': self.obj_padding_spin.value(),
+            obj_border_color=self.obj_border_color_button.get_color(),
+            obj_fill_color=self.obj_fill_color_button.get_color(),
+            obj_border_width=self.obj_border_width_spin.value(),
+            corner_radius=self.corner_radius_spin.value(),
+            min_width=self.min_width_spin.value(),
+            min_height=self.min_height_spin.value(),
+            obj_padding=self.obj_padding_spin.value(),
             
             # Arrows
-            'arrow_color': self.arrow_color_button.get_color(),
-            'arrow_width': self.arrow_width_spin.value(),
-            'arrow_head_size': self.arrow_head_size_spin.value(),
-            'arrow_head_angle': self.arrow_head_angle_spin.value(),
-            'curve_intensity': self.curve_intensity_spin.value(),
-            'self_loop_radius': self.self_loop_radius_spin.value(),
-        }
+            arrow_color=self.arrow_color_button.get_color(),
+            arrow_width=self.arrow_width_spin.value(),
+            arrow_head_size=self.arrow_head_size_spin.value(),
+            arrow_head_angle=self.arrow_head_angle_spin.value(),
+            curve_intensity=self.curve_intensity_spin.value(),
+            self_loop_radius=self.self_loop_radius_spin.value(),
+        )
     
     def set_settings(self, settings):
-        """Set settings from a dictionary."""
+        """Set settings from a DiagramSettings."""
         # Appearance
-        if 'bg_color' in settings:
-            self.bg_color_button.set_color(settings['bg_color'])
-        if 'selection_color' in settings:
-            self.selection_color_button.set_color(settings['selection_color'])
-        if 'font_size' in settings:
-            self.font_size_spin.setValue(settings['font_size'])
-        if 'text_color' in settings:
-            self.text_color_button.set_color(settings['text_color'])
+        self.bg_color_button.set_color(settings.bg_color)
+        self.selection_color_button.set_color(settings.selection_color)
+        self.font_size_spin.setValue(settings.font_size)
+        self.text_color_button.set_color(settings.text_color)
         
         # Grid
-        if 'grid_spacing' in settings:
-            self.grid_spacing_spin.setValue(settings['grid_spacing'])
-        if 'show_grid' in settings:
-            self.show_grid_check.setChecked(settings['show_grid'])
-        if 'grid_color' in settings:
-            self.grid_color_button.set_color(settings['grid_color'])
-        if 'grid_width' in settings:
-            self.grid_width_spin.setValue(settings['grid_width'])
-        if 'snap_to_grid' in settings:
-            self.snap_to_grid_check.setChecked(settings['snap_to_grid'])
-        if 'auto_grid_spacing' in settings:
-            self.auto_grid_spacing_check.setChecked(settings['auto_grid_spacing'])
+        self.grid_spacing_spin.setValue(settings.grid_spacing)
+        self.show_grid_check.setChecked(settings.show_grid)
+        self.grid_color_button.set_color(settings.grid_color)
+        self.grid_width_spin.setValue(settings.grid_width)
+        self.snap_to_grid_check.setChecked(settings.snap_to_grid)
+        self.auto_grid_spacing_check.setChecked(settings.auto_grid_spacing)
         
         # Objects
-        if 'obj_border_color' in settings:
-            self.obj_border_color_button.set_color(settings['obj_border_color'])
-        if 'obj_fill_color' in settings:
-            self.obj_fill_color_button.set_color(settings['obj_fill_color'])
-        if 'obj_border_width' in settings:
-            self.obj_border_width_spin.setValue(settings['obj_border_width'])
-        if 'corner_radius' in settings:
-            self.corner_radius_spin.setValue(settings['corner_radius'])
-        if 'min_width' in settings:
-            self.min_width_spin.setValue(settings['min_width'])
-        if 'min_height' in settings:
-            self.min_height_spin.setValue(settings['min_height'])
-        if 'obj_padding' in settings:
-            self.obj_padding_spin.setValue(settings['obj_padding'])
+        self.obj_border_color_button.set_color(settings.obj_border_color)
+        self.obj_fill_color_button.set_color(settings.obj_fill_color)
+        self.obj_border_width_spin.setValue(settings.obj_border_width)
+        self.corner_radius_spin.setValue(settings.corner_radius)
+        self.min_width_spin.setValue(settings.min_width)
+        self.min_height_spin.setValue(settings.min_height)
+        self.obj_padding_spin.setValue(settings.obj_padding)
         
         # Arrows
-        if 'arrow_color' in settings:
-            self.arrow_color_button.set_color(settings['arrow_color'])
-        if 'arrow_width' in settings:
-            self.arrow_width_spin.setValue(settings['arrow_width'])
-        if 'arrow_head_size' in settings:
-            self.arrow_head_size_spin.setValue(settings['arrow_head_size'])
-        if 'arrow_head_angle' in settings:
-            self.arrow_head_angle_spin.setValue(settings['arrow_head_angle'])
-        if 'curve_intensity' in settings:
-            self.curve_intensity_spin.setValue(settings['curve_intensity'])
-        if 'self_loop_radius' in settings:
-            self.self_loop_radius_spin.setValue(settings['self_loop_radius'])
+        self.arrow_color_button.set_color(settings.arrow_color)
+        self.arrow_width_spin.setValue(settings.arrow_width)
+        self.arrow_head_size_spin.setValue(settings.arrow_head_size)
+        self.arrow_head_angle_spin.setValue(settings.arrow_head_angle)
+        self.curve_intensity_spin.setValue(settings.curve_intensity)
+        self.self_loop_radius_spin.setValue(settings.self_loop_radius)
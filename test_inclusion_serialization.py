@@ -73,6 +73,36 @@ def test_inclusion_serialization():
         print("❌ FAILURE: Arrow inclusion property was lost during serialization/restoration")
         return False
 
+def test_inclusion_toggle_before_save():
+    """Test that a save right after toggling inclusion records the new state."""
+    
+    app = QApplication.instance() or QApplication(sys.argv)
+    
+    scene = DiagramScene()
+    obj_a = Object("A")
+    obj_b = Object("B")
+    obj_b.setPos(300, 0)
+    scene.addItem(obj_a)
+    scene.addItem(obj_b)
+    arrow = Arrow(obj_a, obj_b)
+    arrow.set_text("f")
+    scene.addItem(arrow)
+    
+    session_manager = SessionManager()
+    before = session_manager.serialize_diagram_scene(scene)
+    
+    # No event loop pass between the edit and the save
+    arrow.toggle_inclusion()
+    arrow.set_text("g")
+    after = session_manager.serialize_diagram_scene(scene)
+    
+    print(f"Before toggle: {before['arrows'][0]}")
+    print(f"After toggle: {after['arrows'][0]}")
+    assert not before['arrows'][0]['is_inclusion']
+    assert after['arrows'][0]['is_inclusion']
+    assert after['arrows'][0]['text'] == "g"
+
 if __name__ == "__main__":
     success = test_inclusion_serialization()
+    test_inclusion_toggle_before_save()
     sys.exit(0 if success else 1)
\ No newline at end of file
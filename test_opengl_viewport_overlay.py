@@ -0,0 +1,47 @@
+"""
+Test script to verify that the proof step buttons stay clickable when the
+view switches between the OpenGL and raster viewports.
+"""
+from PyQt6.QtWidgets import QApplication
+import sys
+
+from widget.diagram_scene import DiagramScene
+from widget.diagram_view import DiagramView
+from widget.object_node import Object
+from widget.proof_step_overlay import ProofStepButton
+
+def widget_at_button(view):
+    """Return the view's child widget under the first proof step button."""
+    button = view.proof_step_overlay.button_panel.current_buttons[0]
+    return view.childAt(button.mapTo(view, button.rect().center()))
+
+def test_overlay_above_viewport():
+    """Test that the overlay stays above the viewport after each toggle."""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    scene = DiagramScene()
+    view = DiagramView(scene)
+    view.resize(1000, 700)
+    view.show()
+
+    obj = Object(text="A")
+    scene.addItem(obj)
+    view.set_proof_buttons_enabled(True)
+    obj.setSelected(True)
+    view.on_selection_changed()
+    app.processEvents()
+
+    assert view.proof_step_overlay.isVisible()
+    assert isinstance(widget_at_button(view), ProofStepButton)
+
+    for enabled in (True, False):
+        in_use = view.set_opengl_viewport(enabled)
+        app.processEvents()
+        print(f"OpenGL viewport requested: {enabled}, in use: {in_use}")
+        assert isinstance(widget_at_button(view), ProofStepButton)
+
+    print("✓ Proof step buttons stay above the viewport")
+
+if __name__ == "__main__":
+    test_overlay_above_viewport()
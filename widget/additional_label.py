@@ -9,6 +9,9 @@ from PyQt6.QtGui import QFont, QColor, QAction
 class AdditionalLabel(QGraphicsTextItem):
     """Additional text label that can be moved around the diagram."""
     
+    # Item type id, as returned by type()
+    Type = QGraphicsItem.UserType + 3
+    
     def __init__(self, text="Label", parent=None):
         super().__init__(text, parent)
         
@@ -83,4 +86,4 @@ class AdditionalLabel(QGraphicsTextItem):
     
     def type(self):
         """Return the type identifier for this item."""
-        return QGraphicsItem.UserType + 3
+        return self.Type
@@ -1,19 +1,202 @@
 """
 Arrow node for connecting objects in DAG diagrams.
 """
-from PyQt6.QtWidgets import QGraphicsItem, QMenu
-from PyQt6.QtCore import QRectF, QPointF, Qt, pyqtSignal
-from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QPolygonF, QFont, QAction
+from PyQt6.QtWidgets import QGraphicsItem, QGraphicsView, QMenu
+from PyQt6.QtCore import QRectF, QPointF, QLineF, Qt, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QPolygonF, QFont, QAction, QPainterPath, QFontMetrics
 import math
+import re
+import functools
+import weakref
+from contextlib import contextmanager
+from core.app import undo_stack
 from .node import Node
 
 
+# Arrow heads are drawn at +/- pi/8 from the arrow direction
+_COS_PI_8 = math.cos(math.pi / 8)
+_SIN_PI_8 = math.sin(math.pi / 8)
+
+# Vee tails open at +/- pi/6 from the arrow direction
+_COS_PI_6 = math.cos(math.pi / 6)
+_SIN_PI_6 = math.sin(math.pi / 6)
+
+# Self-loops end at 20 degrees with the head along the tangent there, so
+# every trig value they need is a constant
+_LOOP_END_ANGLE = math.radians(20)
+_LOOP_END_COS = math.cos(_LOOP_END_ANGLE)
+_LOOP_END_SIN = math.sin(_LOOP_END_ANGLE)
+_LOOP_TANGENT_ANGLE = _LOOP_END_ANGLE + math.pi / 2
+_LOOP_HEAD_COS_1 = math.cos(_LOOP_TANGENT_ANGLE - math.pi / 8)
+_LOOP_HEAD_SIN_1 = math.sin(_LOOP_TANGENT_ANGLE - math.pi / 8)
+_LOOP_HEAD_COS_2 = math.cos(_LOOP_TANGENT_ANGLE + math.pi / 8)
+_LOOP_HEAD_SIN_2 = math.sin(_LOOP_TANGENT_ANGLE + math.pi / 8)
+
+# Arrow lines are sorted into this many direction buckets over [0, pi), so
+# opposite arrows share a bucket. Lines shorter than the minimum length get no
+# bucket, since moving an endpoint by the 1 unit the overlap test tolerates
+# could turn them further than a bucket.
+_ANGLE_BUCKETS = 64
+_ANGLE_BUCKET_MIN_LENGTH = 64
+
+
+# Label background sizes keyed by (font key, text, dpi); cleared when it
+# grows past _TEXT_METRICS_CACHE_MAX entries
+_TEXT_METRICS_CACHE = {}
+_TEXT_METRICS_CACHE_MAX = 4096
+
+
+def _text_bg_size(painter, font, text, padding=4):
+    """Return the (width, height) of a label background for text drawn in font."""
+    device = painter.device()
+    key = (font.key(), text, device.logicalDpiX() if device else 0)
+    size = _TEXT_METRICS_CACHE.get(key)
+    if size is None:
+        text_rect = painter.fontMetrics().boundingRect(text)
+        size = (text_rect.width() + 2 * padding, text_rect.height() + 2 * padding)
+        if len(_TEXT_METRICS_CACHE) >= _TEXT_METRICS_CACHE_MAX:
+            _TEXT_METRICS_CACHE.clear()
+        _TEXT_METRICS_CACHE[key] = size
+    return size
+
+
+@functools.lru_cache(maxsize=256)
+def _rounded_rect_segments(x, y, width, height, corner_radius):
+    """Flatten a rounded rectangle into a tuple of (x1, y1, x2, y2) segments.
+    
+    Cached because node sizes and corner radii rarely change while their
+    boundaries are intersected on every arrow update.
+    """
+    # Create rounded rectangle path
+    path = QPainterPath()
+    path.addRoundedRect(QRectF(x, y, width, height), corner_radius, corner_radius)
+    
+    # Convert path to polygons (line segments)
+    polygon = path.toFillPolygon()
+    points = [(point.x(), point.y()) for point in polygon]
+    
+    # Close the path if needed
+    if points:
+        points.append(points[0])
+    
+    return tuple(points[i] + points[i + 1] for i in range(len(points) - 1))
+
+
+def _ray_rounded_rect_hit(cx, cy, dx, dy, left, top, right, bottom, radius):
+    """Return where the ray from (cx, cy) along (dx, dy) leaves a rounded rectangle.
+    
+    The ray has to start inside the rounded rectangle; None is returned
+    otherwise or when the direction has no length. The radius is clamped the
+    way QPainterPath.addRoundedRect clamps it.
+    """
+    if not (left <= cx <= right and top <= cy <= bottom):
+        return None
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return None
+    dx /= length
+    dy /= length
+    
+    radius = max(0.0, min(radius, (right - left) / 2, (bottom - top) / 2))
+    inner_left, inner_right = left + radius, right - radius
+    inner_top, inner_bottom = top + radius, bottom - radius
+    
+    # Starting in a corner square but outside its arc is outside the shape
+    if not (inner_left <= cx <= inner_right or inner_top <= cy <= inner_bottom):
+        ox = cx - (inner_right if cx > inner_right else inner_left)
+        oy = cy - (inner_bottom if cy > inner_bottom else inner_top)
+        if ox * ox + oy * oy > radius * radius:
+            return None
+    
+    # Leave the plain rectangle first
+    t = math.inf
+    if dx > 0:
+        t = (right - cx) / dx
+    elif dx < 0:
+        t = (left - cx) / dx
+    if dy > 0:
+        t = min(t, (bottom - cy) / dy)
+    elif dy < 0:
+        t = min(t, (top - cy) / dy)
+    hit_x = cx + t * dx
+    hit_y = cy + t * dy
+    
+    if radius == 0:
+        return hit_x, hit_y
+    
+    # If the hit lies in a corner square, the exit is on that corner's arc
+    if inner_left <= hit_x <= inner_right or inner_top <= hit_y <= inner_bottom:
+        return hit_x, hit_y
+    
+    arc_x = inner_right if hit_x > inner_right else inner_left
+    arc_y = inner_bottom if hit_y > inner_bottom else inner_top
+    
+    # Far root of |c + t*d - arc|^2 = radius^2
+    ox = cx - arc_x
+    oy = cy - arc_y
+    b = ox * dx + oy * dy
+    discriminant = b * b - (ox * ox + oy * oy - radius * radius)
+    if discriminant < 0:
+        return hit_x, hit_y  # Only reachable through rounding error
+    t = -b + math.sqrt(discriminant)
+    return cx + t * dx, cy + t * dy
+
+
+@contextmanager
+def batch_updates(scene):
+    """Reposition many arrows in a scene with a single repaint at the end.
+    
+    While active the views use BoundingRectViewportUpdate and arrows skip
+    their own update() calls; the scene is repainted once on exit.
+    """
+    if scene is None or getattr(scene, '_in_batch', False):
+        yield
+        return
+    
+    saved_modes = []
+    for view in scene.views():
+        saved_modes.append((view, view.viewportUpdateMode()))
+        view.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.BoundingRectViewportUpdate)
+    scene._in_batch = True
+    try:
+        yield
+    finally:
+        scene._in_batch = False
+        scene.update()
+        for view, mode in saved_modes:
+            view.setViewportUpdateMode(mode)
+
+
 class Arrow(Node):
     """Arrow node for connecting objects in the DAG."""
     
+    # Item type id, as returned by type()
+    Type = QGraphicsItem.UserType + 2
+    
     # Signal emitted when arrow text changes
     text_changed = pyqtSignal(str)  # emits the new text
     
+    # Highlight pens and brushes shared by every arrow with the same color;
+    # cycle highlighting tends to paint many arrows in one color at once
+    _highlight_pen_cache = {}  # (rgba, width) -> QPen
+    _highlight_brush_cache = {}  # rgba -> QBrush
+    
+    # Arrow style entries of the context menu as (label, state attribute,
+    # toggle slot); a None attribute marks a fixed, always-checked entry
+    _REGULAR_STYLE_ACTIONS = (
+        ("🔗 Inclusion", '_is_inclusion', 'toggle_inclusion'),
+        ("↪️ Monomorphism", '_is_monomorphism', 'toggle_monomorphism'),
+        ("⤠ Epimorphism", '_is_epimorphism', 'toggle_epimorphism'),
+        ("↔️ Isomorphism", '_is_isomorphism', 'toggle_isomorphism'),
+        ("➡️ General Arrow", '_is_general', 'toggle_general'),
+    )
+    # Kernel arrows are always inclusions
+    _KERNEL_STYLE_ACTIONS = (
+        ("🔗 Inclusion", None, None),
+        ("↔️ Isomorphism", '_is_isomorphism', 'toggle_isomorphism'),
+        ("⤠ Epimorphism", '_is_epimorphism', 'toggle_epimorphism'),
+    )
+    
     def __init__(self, start_node=None, end_node=None, text="a", parent=None):
         super().__init__(parent)
         self._start_node = start_node
@@ -21,16 +204,41 @@ class Arrow(Node):
         self._start_point = QPointF(0, 0)
         self._end_point = QPointF(100, 0)
         
+        # Direction of a straight arrow, refreshed when its end points move
+        self._angle = None
+        self._angle_cos = 1.0
+        self._angle_sin = 0.0
+        
         # Self-loop properties
         self._is_self_loop = False
         self._loop_center = QPointF(0, 0)
         self._loop_radius = 50
+        self._best_side_cache = None  # (scene change counters, bucketed node pos, side)
+        self._line_cache = None  # (scene change counter, QLineF from _get_arrow_line)
+        self._unit_perp_cache = None  # (QLineF it was computed from, (perp_x, perp_y))
+        self._angle_bucket_cache = None  # (QLineF it was computed from, bucket or None)
+        self._parallel_cache = None  # (scene change counter, list from _find_parallel_arrows)
         
         # Parallel arrow properties
         self._is_curved = False
         self._curve_offset = 0
+        self._parallel_key = None      # sorted ids of this arrow's parallel set
+        self._parallel_counter = None  # scene change counter when the key was computed
+        self._parallel_group = []      # this arrow plus its parallel arrows, as last computed
         self._control_point_1 = QPointF(0, 0)
         self._control_point_2 = QPointF(0, 0)
+        self._bezier_inputs = None     # (start, end, offset, direction) the control points came from
+        
+        # Paint geometry retained between repaints, rebuilt when the arrow moves
+        self._cached_path = None       # QPainterPath for curved arrows
+        self._cached_loop_geom = None  # (loop_rect, arrow_tip, arrow_p1, arrow_p2) for self-loops
+        self._cached_bounding_rect = None  # Cleared whenever the outline, label or pen width changes
+        self._cached_outline_rect = None   # The same without the label
+        self._cached_shape = None
+        
+        # Context menus, built on first use as (menu, {name: checkable action})
+        self._context_menu = None
+        self._kernel_context_menu = None
         
         # Arrow text properties
         self._text = text
@@ -46,6 +254,7 @@ class Arrow(Node):
         # "There Exists" property for dashed line style
         self._there_exists = False
         self._solid_pen = self._pen  # Store original solid pen
+        self._pen_variants = None  # (solid pen they came from, solid copy, dashed copy)
         
         # Arrow style properties
         self._is_inclusion = False      # HookTail
@@ -68,20 +277,19 @@ class Arrow(Node):
         # Set arrow to appear behind objects
         self.setZValue(-1)
         
-        # Connect to node movement signals if nodes are provided
-        if self._start_node:
-            self._start_node.node_moved.connect(self.update_position)
-            # Connect to name changes to update label visibility
-            if hasattr(self._start_node, 'name_changed'):
-                self._start_node.name_changed.connect(self._update_label_visibility)
-        if self._end_node:
-            self._end_node.node_moved.connect(self.update_position)
-            # Connect to name changes to update label visibility  
-            if hasattr(self._end_node, 'name_changed'):
-                self._end_node.name_changed.connect(self._update_label_visibility)
+        # Pans and repaints of unchanged arrows reuse a cached pixmap; any
+        # update() or geometry change re-renders it
+        self.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
+        
+        # Connect to node movement and name changes if nodes are provided
+        self._rebind(self._start_node, True)
+        self._rebind(self._end_node, True)
             
         # Signal connections for text updates (to be managed by proof steps)
-        self._signal_connections = []  # List of (sender, signal, slot) tuples
+        # Connections are never disconnected; the slots ignore any sender that
+        # is not part of the current setup instead
+        self._signal_senders = set()  # (sender, slot name) pairs since the last _signal_setup
+        self._signal_wired = weakref.WeakKeyDictionary()  # Sender -> slot names connected once
             
         self.update_position()
         
@@ -93,7 +301,6 @@ class Arrow(Node):
         self._signal_cleanup()  # Clean up any existing connections
         
         # Check for identity arrows (𝟏(X) pattern)
-        import re
         identity_matches = re.findall(r'𝟏\(([^)∘\s]+)\)', self._text)
         for node_name in identity_matches:
             # Find the node with this name in the scene
@@ -103,8 +310,7 @@ class Arrow(Node):
                         hasattr(item, 'name_changed') and 
                         item.get_text() == node_name):
                         # Connect this node's name_changed to our text update
-                        item.name_changed.connect(self._update_identity_text)
-                        self._signal_connections.append((item, item.name_changed, self._update_identity_text))
+                        self._signal_connect(item, item.name_changed, self._update_identity_text)
         
         # Check for composition arrows (containing ∘ symbol)
         if '∘' in self._text:
@@ -120,63 +326,118 @@ class Arrow(Node):
                                 item.get_text() == comp_name):
                                 # Connect this arrow's text changes to our composition update
                                 if hasattr(item, 'text_changed'):
-                                    item.text_changed.connect(self._update_composition_text)
-                                    self._signal_connections.append((item, item.text_changed, self._update_composition_text))
+                                    self._signal_connect(item, item.text_changed, self._update_composition_text)
+    
+    def _signal_connect(self, sender, signal, slot):
+        """Connect a sender's signal to one of our slots, at most once per sender and slot."""
+        wired = self._signal_wired.setdefault(sender, set())
+        if slot.__name__ not in wired:
+            signal.connect(slot)
+            wired.add(slot.__name__)
+        self._signal_senders.add((sender, slot.__name__))
     
     def _signal_cleanup(self):
-        """Clean up all signal connections."""
-        for sender, signal, slot in self._signal_connections:
-            try:
-                signal.disconnect(slot)
-            except (RuntimeError, TypeError):
-                pass  # Connection might already be broken
-        self._signal_connections.clear()
+        """Clean up all signal connections.
+        
+        The Qt connections stay in place (and are dropped by Qt when either
+        side is destroyed); forgetting the senders makes the slots ignore them.
+        """
+        self._signal_senders.clear()
         
+    @pyqtSlot(str)
     def _update_identity_text(self, new_name):
         """Update identity references when node names change."""
-        import re
         # Replace all instances of 𝟏(oldname) with 𝟏(newname)
         # This is a bit tricky since we need to find which node changed
         sender = self.sender()
+        if (sender, '_update_identity_text') not in self._signal_senders:
+            return  # Left over from a previous _signal_setup
         if sender and hasattr(sender, 'get_text'):
             old_name = sender.get_text()  # This might not work during the change...
             # For now, we'll rebuild the entire text by re-examining the scene
             self._rebuild_identity_text()
     
+    @pyqtSlot(str)
     def _update_composition_text(self, new_text):
         """Update composition when component arrow text changes."""
+        if (self.sender(), '_update_composition_text') not in self._signal_senders:
+            return  # Left over from a previous _signal_setup
         # For composition updates, we'd need to rebuild the entire composition
         # This is complex and might be better handled by the proof step system
-        pass
     
     def _rebuild_identity_text(self):
         """Rebuild identity text by examining current node names."""
-        import re
         new_text = self._text
         
         # Find all identity patterns and update them with current node names
         identity_matches = re.findall(r'𝟏\(([^)∘\s]+)\)', self._text)
-        for old_node_name in identity_matches:
-            # Find if there's a node that was previously named this
-            if self.scene():
-                for item in self.scene().items():
-                    if (hasattr(item, 'get_text') and 
-                        hasattr(item, 'name_changed')):
-                        current_name = item.get_text()
-                        # Replace the identity reference
-                        new_text = re.sub(f'𝟏\\({re.escape(old_node_name)}\\)', f'𝟏({current_name})', new_text)
-                        break
+        if identity_matches and self.scene():
+            # Find if there's a node that was previously named this; the scan
+            # stops at the first named node and is shared by every match
+            node = next((item for item in self.scene().items()
+                         if hasattr(item, 'get_text') and hasattr(item, 'name_changed')), None)
+            if node is not None:
+                current_name = node.get_text()
+                for old_node_name in identity_matches:
+                    # Replace the identity reference
+                    new_text = re.sub(f'𝟏\\({re.escape(old_node_name)}\\)', f'𝟏({current_name})', new_text)
         
         if new_text != self._text:
             self.set_text(new_text)
     
     def boundingRect(self):
         """Return the bounding rectangle of the arrow."""
+        if self._cached_bounding_rect is None:
+            self._cached_bounding_rect = self._compute_bounding_rect()
+        return self._cached_bounding_rect
+    
+    def shape(self):
+        """Return the arrow's shape, its bounding rectangle as in QGraphicsItem."""
+        if self._cached_shape is None:
+            path = QPainterPath()
+            path.addRect(self.boundingRect())
+            self._cached_shape = path
+        return self._cached_shape
+    
+    def _invalidate_geometry(self):
+        """Announce a geometry change to the scene and drop the cached outline."""
+        self.prepareGeometryChange()
+        self._cached_bounding_rect = None
+        self._cached_outline_rect = None
+        self._cached_shape = None
+    
+    def _outline_rect(self):
+        """Return the bounding rectangle of the arrow's lines and heads, without the label."""
+        if self._cached_outline_rect is None:
+            self._cached_outline_rect = self._compute_outline_rect()
+        return self._cached_outline_rect
+    
+    def _compute_bounding_rect(self):
+        """Calculate the bounding rectangle of the arrow."""
+        rect = self._outline_rect()
+        
+        # The label is painted by this item as well, so it has to be inside
+        # the bounds or the item cache would clip it
+        if self._text and self._label_visible and not self._label_manually_hidden:
+            text_rect = QFontMetrics(self._font).boundingRect(self._text)
+            bg_width = text_rect.width() + 2 * 4 + 2  # Padding as in _text_bg_size, plus a margin
+            bg_height = text_rect.height() + 2 * 4 + 2
+            mid_x, mid_y = self._label_center()
+            rect = rect.united(QRectF(mid_x - bg_width / 2, mid_y - bg_height / 2, bg_width, bg_height))
+        
+        return rect
+    
+    def _compute_outline_rect(self):
+        """Calculate the bounding rectangle of the arrow's lines and heads."""
         if not self._start_point or not self._end_point:
             return QRectF(0, 0, 0, 0)
         
-        # Calculate bounding box that includes arrow head
-        extra = self._arrow_head_size + (self._pen.width() / 2)
+        # Calculate bounding box that includes arrow head; the inclusion hook
+        # tail reaches twice as far out from the start point
+        if self._is_inclusion:
+            extra = 2 * self._arrow_head_size + (self._pen.width() / 2)
+        else:
+            extra = self._arrow_head_size + (self._pen.width() / 2)
         
         if hasattr(self, '_is_self_loop') and self._is_self_loop and hasattr(self, '_loop_center'):
             # For self-loops, use the loop circle bounds
@@ -207,6 +468,9 @@ class Arrow(Node):
             
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         painter.setPen(self._pen)
+        # The view does not reset the painter between items, and curves are
+        # drawn as paths that would otherwise pick up a previous item's fill
+        painter.setBrush(Qt.BrushStyle.NoBrush)
         
         if hasattr(self, '_is_self_loop') and self._is_self_loop:
             self._paint_self_loop(painter)
@@ -233,53 +497,67 @@ class Arrow(Node):
         # Draw the line
         painter.drawLine(self._start_point, self._end_point)
         
-        # Calculate arrow angle
-        angle = math.atan2(
-            (self._end_point.y() - self._start_point.y()),
-            (self._end_point.x() - self._start_point.x())
-        )
+        # Arrow angle is cached whenever the end points move
+        if self._angle is None:
+            self._update_direction()
         
         # Draw arrow tail based on style
-        self._draw_arrow_tail(painter, angle)
+        self._draw_arrow_tail(painter, self._angle, self._angle_cos, self._angle_sin)
         
         # Draw arrow head based on style
-        self._draw_arrow_head(painter, angle)
+        self._draw_arrow_head(painter, self._angle, self._angle_cos, self._angle_sin)
+    
+    def _update_direction(self, _atan2=math.atan2, _cos=math.cos, _sin=math.sin):
+        """Cache the angle of the straight line from start to end point."""
+        # The math functions are bound as defaults so the lookups are local
+        self._angle = _atan2(
+            (self._end_point.y() - self._start_point.y()),
+            (self._end_point.x() - self._start_point.x())
+        )
+        self._angle_cos = _cos(self._angle)
+        self._angle_sin = _sin(self._angle)
     
-    def _paint_curved_arrow(self, painter):
+    def _get_curve_path(self):
+        """Return the bezier path for a curved arrow, building it if needed."""
+        if self._cached_path is None:
+            path = QPainterPath()
+            path.moveTo(self._start_point)
+            path.cubicTo(self._control_point_1, self._control_point_2, self._end_point)
+            self._cached_path = path
+        return self._cached_path
+    
+    def _paint_curved_arrow(self, painter, _hypot=math.hypot):
         """Paint a curved arrow using bezier curves."""
-        from PyQt6.QtGui import QPainterPath
-        
-        # Create bezier path
-        path = QPainterPath()
-        path.moveTo(self._start_point)
-        path.cubicTo(self._control_point_1, self._control_point_2, self._end_point)
-        
         # Draw the curved line
-        painter.drawPath(path)
+        painter.drawPath(self._get_curve_path())
         
-        # Calculate arrow head angle at the end point
+        # Calculate arrow head direction at the end point
         # Use the direction from control_point_2 to end_point
-        angle = math.atan2(
-            (self._end_point.y() - self._control_point_2.y()),
-            (self._end_point.x() - self._control_point_2.x())
-        )
+        head_dx = self._end_point.x() - self._control_point_2.x()
+        head_dy = self._end_point.y() - self._control_point_2.y()
+        head_length = _hypot(head_dx, head_dy)
+        if head_length > 0:
+            head_cos, head_sin = head_dx / head_length, head_dy / head_length
+        else:
+            head_cos, head_sin = 1.0, 0.0  # Same as atan2(0, 0) == 0
         
-        # Calculate tail angle at start point
+        # Calculate tail direction at start point
         # Use the direction from start_point to control_point_1
-        tail_angle = math.atan2(
-            (self._control_point_1.y() - self._start_point.y()),
-            (self._control_point_1.x() - self._start_point.x())
-        )
+        tail_dx = self._control_point_1.x() - self._start_point.x()
+        tail_dy = self._control_point_1.y() - self._start_point.y()
+        tail_length = _hypot(tail_dx, tail_dy)
+        if tail_length > 0:
+            tail_cos, tail_sin = tail_dx / tail_length, tail_dy / tail_length
+        else:
+            tail_cos, tail_sin = 1.0, 0.0
         
-        # Draw arrow tail and head based on style
-        self._draw_arrow_tail(painter, tail_angle)
-        self._draw_arrow_head(painter, angle)
+        # Draw arrow tail and head based on style; the angles themselves are
+        # only needed by the hook tail, which derives it when drawn
+        self._draw_arrow_tail(painter, None, tail_cos, tail_sin)
+        self._draw_arrow_head(painter, None, head_cos, head_sin)
     
-    def _paint_self_loop(self, painter):
-        """Paint a self-loop arrow as a circular arc."""
-        from PyQt6.QtCore import QRect
-        
-        # Draw the circular loop
+    def _compute_self_loop_geometry(self):
+        """Compute the loop rectangle and arrow head points for a self-loop."""
         loop_rect = QRectF(
             self._loop_center.x() - self._loop_radius,
             self._loop_center.y() - self._loop_radius,
@@ -287,32 +565,40 @@ class Arrow(Node):
             2 * self._loop_radius
         )
         
-        # Draw arc (almost full circle, leaving small gap)
-        start_angle = 20 * 16  # 20 degrees in 1/16 degree units
-        span_angle = 320 * 16  # 320 degrees span (leaving 40 degree gap)
-        
-        painter.drawArc(loop_rect, start_angle, span_angle)
-        
-        # Calculate arrow head position and angle
-        end_angle_rad = math.radians(20)  # End at 20 degrees
-        arrow_tip_x = self._loop_center.x() + self._loop_radius * math.cos(end_angle_rad)
-        arrow_tip_y = self._loop_center.y() + self._loop_radius * math.sin(end_angle_rad)
+        # Arrow head position at the end of the arc (20 degrees)
+        arrow_tip_x = self._loop_center.x() + self._loop_radius * _LOOP_END_COS
+        arrow_tip_y = self._loop_center.y() + self._loop_radius * _LOOP_END_SIN
         arrow_tip = QPointF(arrow_tip_x, arrow_tip_y)
         
-        # Calculate arrow head direction (tangent to circle)
-        tangent_angle = end_angle_rad + math.pi / 2
-        
-        # Arrow head points - using smaller angle for pointier arrow head
+        # Arrow head points along the tangent - using smaller angle for pointier arrow head
         arrow_p1 = QPointF(
-            arrow_tip.x() - self._arrow_head_size * math.cos(tangent_angle - math.pi / 8),
-            arrow_tip.y() - self._arrow_head_size * math.sin(tangent_angle - math.pi / 8)
+            arrow_tip_x - self._arrow_head_size * _LOOP_HEAD_COS_1,
+            arrow_tip_y - self._arrow_head_size * _LOOP_HEAD_SIN_1
         )
         
         arrow_p2 = QPointF(
-            arrow_tip.x() - self._arrow_head_size * math.cos(tangent_angle + math.pi / 8),
-            arrow_tip.y() - self._arrow_head_size * math.sin(tangent_angle + math.pi / 8)
+            arrow_tip_x - self._arrow_head_size * _LOOP_HEAD_COS_2,
+            arrow_tip_y - self._arrow_head_size * _LOOP_HEAD_SIN_2
         )
         
+        return loop_rect, arrow_tip, arrow_p1, arrow_p2
+    
+    def _get_self_loop_geometry(self):
+        """Return the cached self-loop geometry, computing it if needed."""
+        if self._cached_loop_geom is None:
+            self._cached_loop_geom = self._compute_self_loop_geometry()
+        return self._cached_loop_geom
+    
+    def _paint_self_loop(self, painter):
+        """Paint a self-loop arrow as a circular arc."""
+        loop_rect, arrow_tip, arrow_p1, arrow_p2 = self._get_self_loop_geometry()
+        
+        # Draw arc (almost full circle, leaving small gap)
+        start_angle = 20 * 16  # 20 degrees in 1/16 degree units
+        span_angle = 320 * 16  # 320 degrees span (leaving 40 degree gap)
+        
+        painter.drawArc(loop_rect, start_angle, span_angle)
+        
         # Draw V-shape arrow head with two lines
         painter.drawLine(arrow_tip, arrow_p1)
         painter.drawLine(arrow_tip, arrow_p2)
@@ -320,26 +606,16 @@ class Arrow(Node):
     def _paint_self_loop_outline(self, painter):
         """Paint selection outline for self-loop."""
         if hasattr(self, '_loop_center') and hasattr(self, '_loop_radius'):
-            loop_rect = QRectF(
-                self._loop_center.x() - self._loop_radius,
-                self._loop_center.y() - self._loop_radius,
-                2 * self._loop_radius,
-                2 * self._loop_radius
-            )
+            loop_rect = self._get_self_loop_geometry()[0]
             start_angle = 20 * 16
             span_angle = 320 * 16
             painter.drawArc(loop_rect, start_angle, span_angle)
     
     def _paint_curved_arrow_outline(self, painter):
         """Paint selection outline for curved arrow."""
-        from PyQt6.QtGui import QPainterPath
-        
         if (hasattr(self, '_control_point_1') and hasattr(self, '_control_point_2') and 
             self._start_point and self._end_point):
-            path = QPainterPath()
-            path.moveTo(self._start_point)
-            path.cubicTo(self._control_point_1, self._control_point_2, self._end_point)
-            painter.drawPath(path)
+            painter.drawPath(self._get_curve_path())
     
     def _draw_text_label(self, painter):
         """Draw the text label in the middle of the arrow, breaking the line."""
@@ -348,36 +624,16 @@ class Arrow(Node):
         
         # Set up text drawing
         painter.setFont(self._font)
-        text_rect = painter.fontMetrics().boundingRect(self._text)
         
         # Calculate text background rectangle (slightly larger than text)
-        padding = 4
-        bg_width = text_rect.width() + 2 * padding
-        bg_height = text_rect.height() + 2 * padding
+        bg_width, bg_height = _text_bg_size(painter, self._font, self._text)
         
-        if hasattr(self, '_is_self_loop') and self._is_self_loop:
-            # For self-loops, position text at the far point of the loop
-            mid_point = QPointF(
-                self._loop_center.x(),
-                self._loop_center.y() - self._loop_radius - 10
-            )
-        elif hasattr(self, '_is_curved') and self._is_curved and hasattr(self, '_control_point_1'):
-            # For curved arrows, position text at the curve's peak
-            # Use the midpoint between the two control points
-            mid_point = QPointF(
-                (self._control_point_1.x() + self._control_point_2.x()) / 2,
-                (self._control_point_1.y() + self._control_point_2.y()) / 2
-            )
-        else:
-            # For normal arrows, use midpoint
-            mid_x = (self._start_point.x() + self._end_point.x()) / 2
-            mid_y = (self._start_point.y() + self._end_point.y()) / 2
-            mid_point = QPointF(mid_x, mid_y)
+        mid_x, mid_y = self._label_center()
         
         # Center the background rectangle on the calculated point
         bg_rect = QRectF(
-            mid_point.x() - bg_width / 2,
-            mid_point.y() - bg_height / 2,
+            mid_x - bg_width / 2,
+            mid_y - bg_height / 2,
             bg_width,
             bg_height
         )
@@ -391,10 +647,36 @@ class Arrow(Node):
         painter.setPen(QPen(QColor(0, 0, 0)))
         painter.drawText(bg_rect, Qt.AlignmentFlag.AlignCenter, self._text)
     
+    def _label_center(self):
+        """Return the (x, y) the text label is centered on."""
+        if hasattr(self, '_is_self_loop') and self._is_self_loop:
+            # For self-loops, position text at the far point of the loop
+            return (self._loop_center.x(),
+                    self._loop_center.y() - self._loop_radius - 10)
+        elif hasattr(self, '_is_curved') and self._is_curved and hasattr(self, '_control_point_1'):
+            # For curved arrows, position text at the curve's peak
+            # Use the midpoint between the two control points
+            return ((self._control_point_1.x() + self._control_point_2.x()) / 2,
+                    (self._control_point_1.y() + self._control_point_2.y()) / 2)
+        else:
+            # For normal arrows, use midpoint
+            return ((self._start_point.x() + self._end_point.x()) / 2,
+                    (self._start_point.y() + self._end_point.y()) / 2)
+    
+    @pyqtSlot()
+    def _queue_position_update(self):
+        """Reposition the arrow after a node move, coalesced per event loop pass."""
+        scene = self.scene()
+        if scene is not None and hasattr(scene, 'queue_arrow_update'):
+            scene.queue_arrow_update(self)
+        else:
+            self.update_position()
+    
+    @pyqtSlot()
     def update_position(self):
         """Update arrow position based on connected nodes."""
         if self._start_node and self._end_node:
-            self.prepareGeometryChange()
+            self._invalidate_geometry()
             
             # Check if this is a self-loop
             if self._start_node == self._end_node:
@@ -406,7 +688,18 @@ class Arrow(Node):
             
             # Set arrow position to origin for proper scene coordinates
             self.setPos(0, 0)
-            self.update()
+            self._note_geometry_change()
+            if not getattr(self.scene(), '_in_batch', False):
+                self.update()
+    
+    def _note_geometry_change(self):
+        """Note that this arrow's outline moved, invalidating its cached bounds and the scene's loop side caches."""
+        self._cached_bounding_rect = None
+        self._cached_outline_rect = None
+        self._cached_shape = None
+        scene = self.scene()
+        if scene is not None and hasattr(scene, '_arrow_change_counter'):
+            scene._arrow_change_counter += 1
     
     def _update_normal_arrow_position(self):
         """Update position for normal arrows between different nodes."""
@@ -421,6 +714,8 @@ class Arrow(Node):
         self._end_point = self._get_edge_intersection(
             end_center, start_center, self._end_node
         )
+        self._cached_path = None
+        self._update_direction()
     
     def _update_self_loop_position(self):
         """Update position for self-loop arrows."""
@@ -463,6 +758,8 @@ class Arrow(Node):
         
         self._loop_radius = loop_radius
         self._is_self_loop = True
+        self._cached_loop_geom = self._compute_self_loop_geometry()
+        self._note_geometry_change()
     
     def _find_best_loop_side(self):
         """Find the side of the node with the most empty space for the loop."""
@@ -473,6 +770,17 @@ class Arrow(Node):
         if not scene:
             return 'top'  # Default if no scene
         
+        # Reuse the last answer if no node or arrow in the scene has changed
+        # since; arrows are counted too, including this loop itself
+        change_counter = getattr(scene, '_change_counter', None)
+        if change_counter is not None:
+            change_counter = (change_counter, getattr(scene, '_arrow_change_counter', None))
+        bucketed_pos = (round(node_pos.x()), round(node_pos.y()))
+        if (change_counter is not None and self._best_side_cache is not None and
+                self._best_side_cache[0] == change_counter and
+                self._best_side_cache[1] == bucketed_pos):
+            return self._best_side_cache[2]
+        
         # Define areas to check for each side
         check_distance = max(node_rect.width(), node_rect.height()) * 1.5
         
@@ -487,16 +795,25 @@ class Arrow(Node):
                            check_distance, node_rect.height() + check_distance)
         }
         
+        # Query the scene index once for the union of all four areas,
+        # then bucket the hits into sides
+        union_area = sides['top'].united(sides['bottom']).united(sides['left']).united(sides['right'])
+        # Arrows count with their lines only; their labels are not obstacles
+        nearby_rects = [item.mapRectToScene(item._outline_rect()) if isinstance(item, Arrow)
+                        else item.sceneBoundingRect()
+                        for item in scene.items(union_area)
+                        if item is not self._start_node and isinstance(item, Node)]
+        
         # Count objects in each area
         side_scores = {}
         for side, area in sides.items():
-            items = scene.items(area)
-            # Don't count the node itself
-            object_count = sum(1 for item in items if item != self._start_node and hasattr(item, 'get_text'))
-            side_scores[side] = object_count
+            side_scores[side] = sum(1 for rect in nearby_rects if rect.intersects(area))
         
         # Return the side with the fewest objects (most empty space)
-        return min(side_scores, key=side_scores.get)
+        best_side = min(side_scores, key=side_scores.get)
+        if change_counter is not None:
+            self._best_side_cache = (change_counter, bucketed_pos, best_side)
+        return best_side
     
     @staticmethod
     def update_self_loops_for_node(node):
@@ -504,11 +821,13 @@ class Arrow(Node):
         if not node.scene():
             return
         
-        # Find all self-loops for this node - use Arrow class directly
-        self_loops = []
-        for item in node.scene().items():
-            if isinstance(item, Arrow) and item.get_source() == node and item.get_target() == node:
-                self_loops.append(item)
+        # Find all self-loops for this node
+        scene = node.scene()
+        if hasattr(scene, '_arrows_by_endpoint'):
+            self_loops = scene._arrows_by_endpoint.get(frozenset((node,)), ())
+        else:
+            self_loops = (item for item in scene.items()
+                          if isinstance(item, Arrow) and item.get_source() == node and item.get_target() == node)
         
         # Update position for all self-loops
         for loop in self_loops:
@@ -516,42 +835,133 @@ class Arrow(Node):
             loop.update()
     
     @staticmethod
-    def update_parallel_arrows_in_scene(scene):
-        """Update curve positioning for all arrows in the scene."""
+    def update_parallel_arrows_in_scene(scene, dirty_nodes=None):
+        """Update curve positioning for arrows in the scene.
+        
+        With dirty_nodes=None every arrow is updated. Otherwise only the
+        arrows attached to the given nodes are repositioned, together with
+        the arrows they were or now are parallel to.
+        """
         if not scene:
             return
         
-        # Get all arrows - use Arrow class directly
-        arrows = []
-        for item in scene.items():
-            if isinstance(item, Arrow):
-                arrows.append(item)
+        with batch_updates(scene):
+            Arrow._update_parallel_arrows(scene, dirty_nodes)
+    
+    @staticmethod
+    def _update_parallel_arrows(scene, dirty_nodes):
+        """Body of update_parallel_arrows_in_scene, run inside batch_updates."""
+        if dirty_nodes is not None and hasattr(scene, '_arrows_by_node'):
+            # Arrows whose line actually changed
+            moved_arrows = set()
+            for node in dirty_nodes:
+                moved_arrows.update(scene._arrows_by_node.get(node, ()))
+            
+            # Their old parallel groups may lose a member...
+            affected = set()
+            for arrow in moved_arrows:
+                affected.update(arrow._parallel_group)
+            
+            # Self-loops go last, as their side depends on where the other
+            # arrows of their node now lie
+            for arrow in sorted(moved_arrows, key=lambda arrow: arrow._start_node is arrow._end_node):
+                arrow.update_position()
+            
+            # ...and their new parallel groups may gain one
+            for arrow in moved_arrows:
+                affected.update(arrow._parallel_group)
+            
+            for arrow in affected - moved_arrows:
+                if arrow.scene() is scene:
+                    arrow._update_curve_positioning()
+            return
+        
+        # Get all arrows - use the scene's registry when it keeps one
+        if hasattr(scene, '_arrows'):
+            arrows = list(scene._arrows)
+        else:
+            arrows = [item for item in scene.items() if isinstance(item, Arrow)]
         
-        # Update curve positioning for all arrows
+        # Update curve positioning for all arrows; batch_updates repaints them
+        parallel_map = Arrow._pairwise_parallel_arrows(arrows)
         for arrow in arrows:
-            arrow._update_curve_positioning()
-            arrow.update()
+            arrow._update_curve_positioning(parallel_map[arrow])
+    
+    @staticmethod
+    def _pairwise_parallel_arrows(arrows):
+        """Map each arrow to the arrows it is parallel and overlapping with.
+        
+        Each line is built once and each unordered pair is tested once, where
+        calling _find_parallel_arrows per arrow rebuilds every other arrow's
+        line and tests every pair from both sides.
+        """
+        parallel_map = {arrow: [] for arrow in arrows}
+        connected = [arrow for arrow in arrows if arrow._start_node and arrow._end_node]
+        lines = [arrow._get_arrow_line() for arrow in connected]
+        
+        buckets = [arrow._get_angle_bucket() for arrow in connected]
+        
+        count = len(connected)
+        for i in range(count):
+            arrow = connected[i]
+            line = lines[i]
+            bucket = buckets[i]
+            for j in range(i + 1, count):
+                if not Arrow._angle_buckets_may_match(bucket, buckets[j]):
+                    continue
+                if arrow._lines_are_parallel_and_overlapping(line, lines[j]):
+                    other = connected[j]
+                    parallel_map[arrow].append(other)
+                    parallel_map[other].append(arrow)
+        
+        # Every arrow's full set is now known for this scene state
+        change_counter = getattr(connected[0].scene(), '_change_counter', None) if connected else None
+        if change_counter is not None:
+            for arrow in connected:
+                arrow._parallel_cache = (change_counter, parallel_map[arrow])
+        
+        return parallel_map
     
     def _find_parallel_arrows(self):
         """Find arrows that are geometrically parallel and overlapping with this one."""
         if not self.scene() or not self._start_node or not self._end_node:
             return []
         
+        # Parallelism only depends on the arrow lines, which only change
+        # along with the scene's change counter (see _get_arrow_line)
+        scene = self.scene()
+        change_counter = getattr(scene, '_change_counter', None)
+        if (change_counter is not None and self._parallel_cache is not None and
+                self._parallel_cache[0] == change_counter):
+            return self._parallel_cache[1]
+        
         parallel_arrows = []
         my_line = self._get_arrow_line()
         
+        if hasattr(scene, '_arrows'):
+            # Arrows sharing both endpoints always overlap, so take them
+            # straight from the endpoint index and only test the rest
+            endpoints = frozenset((self._start_node, self._end_node))
+            same_endpoints = scene._arrows_by_endpoint.get(endpoints, ())
+            parallel_arrows.extend(item for item in same_endpoints if item is not self)
+            candidates = (item for item in scene._arrows if item not in same_endpoints)
+        else:
+            candidates = (item for item in scene.items() if isinstance(item, Arrow))
+        
         # Check all other arrows in the scene
-        for item in self.scene().items():
-            if (isinstance(item, Arrow) and 
-                item != self and 
+        my_bucket = self._get_angle_bucket()
+        for item in candidates:
+            if (item != self and 
                 item._start_node and 
-                item._end_node):
+                item._end_node and
+                Arrow._angle_buckets_may_match(my_bucket, item._get_angle_bucket())):
                 
                 # Purely geometric check - ignore node connections completely
                 other_line = item._get_arrow_line()
                 if self._lines_are_parallel_and_overlapping(my_line, other_line):
                     parallel_arrows.append(item)
         
+        self._parallel_cache = (change_counter, parallel_arrows)
         return parallel_arrows
     
     def _get_parallel_set(self):
@@ -564,6 +974,14 @@ class Arrow(Node):
         if not other_arrow._start_node or not other_arrow._end_node:
             return False
         
+        # Use the keys recorded by _update_curve_positioning if neither is stale
+        scene = self.scene()
+        change_counter = getattr(scene, '_change_counter', None)
+        if (change_counter is not None and other_arrow.scene() is scene and
+                self._parallel_counter == change_counter and
+                other_arrow._parallel_counter == change_counter):
+            return self._parallel_key == other_arrow._parallel_key and len(self._parallel_key) > 1
+        
         # Get both sets and check if they're the same
         my_set = set(self._get_parallel_set())
         other_set = set(other_arrow._get_parallel_set())
@@ -574,86 +992,141 @@ class Arrow(Node):
         """Get the geometric line representation of this arrow."""
         if not self._start_node or not self._end_node:
             return None
+        
+        # Node moves bump the scene's change counter, so reuse the line until then
+        change_counter = getattr(self.scene(), '_change_counter', None)
+        if (change_counter is not None and self._line_cache is not None and
+                self._line_cache[0] == change_counter):
+            return self._line_cache[1]
             
         start_pos = self._start_node.pos() + self._start_node.boundingRect().center()
         end_pos = self._end_node.pos() + self._end_node.boundingRect().center()
         
-        return {
-            'start': start_pos,
-            'end': end_pos,
-            'vector': end_pos - start_pos
-        }
+        line = QLineF(start_pos, end_pos)
+        self._line_cache = (change_counter, line)
+        return line
+    
+    def _get_unit_perp(self):
+        """Get the unit vector perpendicular to the arrow line, (0, 0) if it has no length.
+        
+        Cached against the line object itself, so it is invalidated together
+        with _get_arrow_line's cache.
+        """
+        line = self._get_arrow_line()
+        if self._unit_perp_cache is None or self._unit_perp_cache[0] is not line:
+            length = math.hypot(line.dx(), line.dy())
+            inv_length = 1.0 / length if length > 0 else 0.0
+            self._unit_perp_cache = (line, (-line.dy() * inv_length, line.dx() * inv_length))
+        return self._unit_perp_cache[1]
+    
+    def _get_angle_bucket(self):
+        """Get the coarse direction bucket of the arrow line, or None if it is too short."""
+        line = self._get_arrow_line()
+        if self._angle_bucket_cache is None or self._angle_bucket_cache[0] is not line:
+            bucket = None
+            if line is not None and line.length() >= _ANGLE_BUCKET_MIN_LENGTH:
+                angle = math.atan2(line.dy(), line.dx()) % math.pi
+                bucket = int(angle * _ANGLE_BUCKETS / math.pi) % _ANGLE_BUCKETS
+            self._angle_bucket_cache = (line, bucket)
+        return self._angle_bucket_cache[1]
+    
+    @staticmethod
+    def _angle_buckets_may_match(bucket1, bucket2):
+        """Check if two direction buckets are close enough for the lines to be parallel."""
+        if bucket1 is None or bucket2 is None:
+            return True
+        difference = (bucket1 - bucket2) % _ANGLE_BUCKETS
+        return difference <= 1 or difference == _ANGLE_BUCKETS - 1
     
     def _lines_are_parallel_and_overlapping(self, line1, line2):
         """Check if two lines are parallel and geometrically overlapping."""
-        if not line1 or not line2:
+        # QLineF is falsy when null, which a self-loop's line is
+        if line1 is None or line2 is None:
+            return False
+        
+        l1_start, l1_end = line1.p1(), line1.p2()
+        l2_start, l2_end = line2.p1(), line2.p2()
+        
+        # Cheap bounding-box rejection before any sqrt/cross-product work.
+        # The margin covers the 50 unit perpendicular tolerance used in
+        # _segments_close_enough_perpendicularly plus some slack for the
+        # near-parallel threshold.
+        aabb_margin = 60
+        if (min(l1_start.x(), l1_end.x()) - aabb_margin > max(l2_start.x(), l2_end.x()) or
+            min(l2_start.x(), l2_end.x()) - aabb_margin > max(l1_start.x(), l1_end.x()) or
+            min(l1_start.y(), l1_end.y()) - aabb_margin > max(l2_start.y(), l2_end.y()) or
+            min(l2_start.y(), l2_end.y()) - aabb_margin > max(l1_start.y(), l1_end.y())):
             return False
         
         # Special case: if arrows share both endpoints, they definitely overlap
-        if (abs(line1['start'].x() - line2['start'].x()) < 1 and
-            abs(line1['start'].y() - line2['start'].y()) < 1 and
-            abs(line1['end'].x() - line2['end'].x()) < 1 and
-            abs(line1['end'].y() - line2['end'].y()) < 1):
+        if (abs(l1_start.x() - l2_start.x()) < 1 and
+            abs(l1_start.y() - l2_start.y()) < 1 and
+            abs(l1_end.x() - l2_end.x()) < 1 and
+            abs(l1_end.y() - l2_end.y()) < 1):
             return True
         
         # Special case: if arrows have swapped endpoints (opposite directions, same nodes)
-        if (abs(line1['start'].x() - line2['end'].x()) < 1 and
-            abs(line1['start'].y() - line2['end'].y()) < 1 and
-            abs(line1['end'].x() - line2['start'].x()) < 1 and
-            abs(line1['end'].y() - line2['start'].y()) < 1):
+        if (abs(l1_start.x() - l2_end.x()) < 1 and
+            abs(l1_start.y() - l2_end.y()) < 1 and
+            abs(l1_end.x() - l2_start.x()) < 1 and
+            abs(l1_end.y() - l2_start.y()) < 1):
             return True
         
-        v1 = line1['vector']
-        v2 = line2['vector']
+        v1_x, v1_y = line1.dx(), line1.dy()
+        v2_x, v2_y = line2.dx(), line2.dy()
         
         # Calculate vector lengths
-        v1_length = math.sqrt(v1.x()**2 + v1.y()**2)
-        v2_length = math.sqrt(v2.x()**2 + v2.y()**2)
+        v1_length = line1.length()
+        v2_length = line2.length()
         
         # Skip very short vectors (essentially points)
         if v1_length < 1e-6 or v2_length < 1e-6:
             return False
         
         # Check if vectors are parallel (cross product near zero)
-        cross_product = abs(v1.x() * v2.y() - v1.y() * v2.x())
+        cross_product = abs(v1_x * v2_y - v1_y * v2_x)
         parallel_threshold = 1e-3 * v1_length * v2_length  # More restrictive threshold
         
         if cross_product > parallel_threshold:
             return False  # Not parallel enough
         
         # Check if lines overlap (not just parallel but intersecting/touching)
-        return self._lines_overlap(line1, line2)
+        return self._lines_overlap(line1, line2, v1_length, v2_length)
     
-    def _lines_overlap(self, line1, line2):
-        """Check if two parallel line SEGMENTS overlap in their extent."""
+    def _lines_overlap(self, line1, line2, v1_len=None, v2_len=None):
+        """Check if two parallel line SEGMENTS overlap in their extent.
+        
+        Callers that already know the vector lengths can pass them in to
+        avoid recomputing them.
+        """
         # For line segments, we need to check if they actually overlap in space,
         # not just if their infinite extensions would overlap
         
-        v1 = line1['vector']
-        v2 = line2['vector']
-        v1_len = math.sqrt(v1.x()**2 + v1.y()**2)
-        v2_len = math.sqrt(v2.x()**2 + v2.y()**2)
+        if v1_len is None:
+            v1_len = line1.length()
+        if v2_len is None:
+            v2_len = line2.length()
         
         if v1_len == 0 or v2_len == 0:
             return False
         
+        # Unpack the endpoints once; everything below is plain float math
+        x1, y1, x2, y2 = line1.x1(), line1.y1(), line1.x2(), line1.y2()
+        x3, y3, x4, y4 = line2.x1(), line2.y1(), line2.x2(), line2.y2()
+        
         # Use the longer segment's direction as reference
         if v1_len >= v2_len:
-            ref_dir_x = v1.x() / v1_len
-            ref_dir_y = v1.y() / v1_len
+            ref_dir_x = (x2 - x1) / v1_len
+            ref_dir_y = (y2 - y1) / v1_len
         else:
-            ref_dir_x = v2.x() / v2_len
-            ref_dir_y = v2.y() / v2_len
-        
-        # Project all four endpoints onto the reference direction
-        def project_point(point):
-            return point.x() * ref_dir_x + point.y() * ref_dir_y
+            ref_dir_x = (x4 - x3) / v2_len
+            ref_dir_y = (y4 - y3) / v2_len
         
-        # Project the endpoints of both segments
-        seg1_start_proj = project_point(line1['start'])
-        seg1_end_proj = project_point(line1['end'])
-        seg2_start_proj = project_point(line2['start'])
-        seg2_end_proj = project_point(line2['end'])
+        # Project the endpoints of both segments onto the reference direction
+        seg1_start_proj = x1 * ref_dir_x + y1 * ref_dir_y
+        seg1_end_proj = x2 * ref_dir_x + y2 * ref_dir_y
+        seg2_start_proj = x3 * ref_dir_x + y3 * ref_dir_y
+        seg2_end_proj = x4 * ref_dir_x + y4 * ref_dir_y
         
         # Get the actual segment ranges (not extended lines)
         seg1_min = min(seg1_start_proj, seg1_end_proj)
@@ -667,41 +1140,27 @@ class Arrow(Node):
             return False
         
         # Check perpendicular distance between parallel segments
-        return self._segments_close_enough_perpendicularly(line1, line2, ref_dir_x, ref_dir_y)
+        return self._segments_close_enough_perpendicularly(
+            (x1 + x2) / 2, (y1 + y2) / 2, (x3 + x4) / 2, (y3 + y4) / 2, ref_dir_x, ref_dir_y
+        )
     
     def _segments_overlap_in_projection(self, seg1_min, seg1_max, seg2_min, seg2_max):
         """Check if two segments overlap when projected onto their common direction."""
-        # Calculate the actual overlap amount
-        overlap_start = max(seg1_min, seg2_min)
-        overlap_end = min(seg1_max, seg2_max)
-        overlap_length = overlap_end - overlap_start
-        
-        # For debugging: if segments are very similar (likely same endpoints), consider overlapping
-        segment1_length = abs(seg1_max - seg1_min)
-        segment2_length = abs(seg2_max - seg2_min)
-        
-        # If both segments are very similar in position and length, they likely overlap
-        if (abs(seg1_min - seg2_min) < 5 and abs(seg1_max - seg2_max) < 5 and
-            abs(segment1_length - segment2_length) < 10):
-            return True
-        
-        # Require meaningful overlap, but be less strict than before
-        min_overlap_threshold = 10  # Reduced back to 10 units
-        
-        return overlap_length > min_overlap_threshold
-    
-    def _segments_close_enough_perpendicularly(self, line1, line2, ref_dir_x, ref_dir_y):
-        """Check if parallel segments are close enough perpendicular to their direction."""
+        # Require meaningful overlap (more than 10 units), or segments that are
+        # very similar in position, i.e. likely the same endpoints.  Both ends
+        # within 5 units already bounds the length difference below 10, so the
+        # old separate length comparison is implied and dropped.
+        return (min(seg1_max, seg2_max) - max(seg1_min, seg2_min) > 10 or
+                max(abs(seg1_min - seg2_min), abs(seg1_max - seg2_max)) < 5)
+    
+    def _segments_close_enough_perpendicularly(self, line1_mid_x, line1_mid_y, line2_mid_x, line2_mid_y,
+                                               ref_dir_x, ref_dir_y):
+        """Check if parallel segments, given by their midpoints, are close enough perpendicular to their direction."""
         # Calculate perpendicular direction
         perp_dir_x = -ref_dir_y
         perp_dir_y = ref_dir_x
         
         # Project segment midpoints onto perpendicular direction
-        line1_mid_x = (line1['start'].x() + line1['end'].x()) / 2
-        line1_mid_y = (line1['start'].y() + line1['end'].y()) / 2
-        line2_mid_x = (line2['start'].x() + line2['end'].x()) / 2
-        line2_mid_y = (line2['start'].y() + line2['end'].y()) / 2
-        
         line1_perp_proj = line1_mid_x * perp_dir_x + line1_mid_y * perp_dir_y
         line2_perp_proj = line2_mid_x * perp_dir_x + line2_mid_y * perp_dir_y
         
@@ -717,78 +1176,84 @@ class Arrow(Node):
             return False
         
         my_line = self._get_arrow_line()
+        if my_line is None:
+            return False
         
         # Calculate my arrow's visual thickness (consider line width + some margin)
         arrow_thickness = 6  # Approximate visual thickness including line width and margins
         
+        # My midpoint and unit perpendicular are the same for every other arrow
+        perp_x, perp_y = self._get_unit_perp()
+        if perp_x == 0 and perp_y == 0:
+            return False
+        # (the same arithmetic as QLineF.center(), without building a QPointF)
+        my_mid_x = 0.5 * my_line.x1() + 0.5 * my_line.x2()
+        my_mid_y = 0.5 * my_line.y1() + 0.5 * my_line.y2()
+        
         for other_arrow in other_arrows:
             other_line = other_arrow._get_arrow_line()
+            if other_line is None:
+                continue
             
-            # Check if lines are parallel and close enough to overlap visually
-            if self._lines_are_parallel_and_overlapping(my_line, other_line):
-                # Check perpendicular distance between the lines
-                my_mid = QPointF(
-                    (my_line['start'].x() + my_line['end'].x()) / 2,
-                    (my_line['start'].y() + my_line['end'].y()) / 2
-                )
-                other_mid = QPointF(
-                    (other_line['start'].x() + other_line['end'].x()) / 2,
-                    (other_line['start'].y() + other_line['end'].y()) / 2
-                )
-                
-                # Calculate perpendicular distance between parallel lines
-                direction = my_line['vector']
-                direction_length = math.sqrt(direction.x() ** 2 + direction.y() ** 2)
-                if direction_length == 0:
-                    continue
-                    
-                # Perpendicular vector
-                perp_x = -direction.y() / direction_length
-                perp_y = direction.x() / direction_length
-                
-                # Vector between midpoints
-                mid_diff_x = other_mid.x() - my_mid.x()
-                mid_diff_y = other_mid.y() - my_mid.y()
-                
-                # Project onto perpendicular direction
-                perp_distance = abs(mid_diff_x * perp_x + mid_diff_y * perp_y)
-                
-                # If perpendicular distance is less than visual thickness, they overlap
-                if perp_distance < arrow_thickness:
-                    return True
+            # Perpendicular distance between the midpoints first, since it is
+            # far cheaper than the parallel/overlap test
+            other_mid_x = 0.5 * other_line.x1() + 0.5 * other_line.x2()
+            other_mid_y = 0.5 * other_line.y1() + 0.5 * other_line.y2()
+            perp_distance = abs((other_mid_x - my_mid_x) * perp_x +
+                                (other_mid_y - my_mid_y) * perp_y)
+            
+            # If perpendicular distance is less than visual thickness and the
+            # lines are parallel and overlapping, they overlap visually
+            if (perp_distance < arrow_thickness and
+                    self._lines_are_parallel_and_overlapping(my_line, other_line)):
+                return True
         
         return False
     
     def _arrows_point_opposite_directions(self, other_arrow):
         """Check if two arrows point in opposite directions."""
-        my_vector = self._get_arrow_line()['vector']
-        other_vector = other_arrow._get_arrow_line()['vector']
+        my_line = self._get_arrow_line()
+        other_line = other_arrow._get_arrow_line()
         
         # Calculate dot product to determine if directions are opposite
-        dot_product = my_vector.x() * other_vector.x() + my_vector.y() * other_vector.y()
+        dot_product = my_line.dx() * other_line.dx() + my_line.dy() * other_line.dy()
         
         # If dot product is negative, they point in roughly opposite directions
         return dot_product < 0
     
     def _get_direction_factor(self):
         """Get a factor representing the general direction of this arrow."""
-        vector = self._get_arrow_line()['vector']
+        line = self._get_arrow_line()
         
         # Use a combination of x and y to create a direction factor
         # This ensures consistent ordering for arrows pointing in different directions
-        return vector.x() + vector.y() * 1000  # Weight y more heavily for consistent sorting
+        return line.dx() + line.dy() * 1000  # Weight y more heavily for consistent sorting
     
-    def _update_curve_positioning(self):
-        """Update bezier curve positioning for parallel arrows."""
-        parallel_arrows = self._find_parallel_arrows()
+    def _update_curve_positioning(self, parallel_arrows=None):
+        """Update bezier curve positioning for parallel arrows.
+        
+        parallel_arrows may be passed in when it is already known, e.g. from
+        _pairwise_parallel_arrows.
+        """
+        if parallel_arrows is None:
+            parallel_arrows = self._find_parallel_arrows()
+        self._note_geometry_change()
+        
+        # Remember the parallel set so _are_parallel can skip the scene scan
+        self._parallel_counter = getattr(self.scene(), '_change_counter', None)
         
         # Only curve if there are actually other parallel/overlapping arrows
         if not parallel_arrows or len(parallel_arrows) == 0:
-            # No parallel arrows found, use straight line
+            # No parallel arrows found (the common case), use straight line
+            self._parallel_group = [self]
+            self._parallel_key = (id(self),)
             self._is_curved = False
             self._curve_offset = 0
             return
         
+        self._parallel_group = [self] + parallel_arrows
+        self._parallel_key = tuple(sorted(id(arrow) for arrow in self._parallel_group))
+        
         # Double-check: ensure we actually found parallel arrows
         if len(parallel_arrows) == 0:
             self._is_curved = False
@@ -798,39 +1263,38 @@ class Arrow(Node):
         # This arrow is part of a parallel group, so curve it
         self._is_curved = True
         
-        # Sort all arrows (including self) by some consistent criteria for offset assignment
-        all_arrows = [self] + parallel_arrows
-        
-        # Sort by memory address to ensure consistent ordering
-        all_arrows.sort(key=lambda x: id(x))
-        
-        # Find this arrow's index in the sorted list
-        arrow_index = all_arrows.index(self)
-        total_arrows = len(all_arrows)
+        # This arrow's rank among all arrows (including self) by memory address,
+        # which gives a consistent offset assignment without sorting
+        my_id = id(self)
+        arrow_index = sum(1 for arrow in parallel_arrows if id(arrow) < my_id)
+        total_arrows = len(parallel_arrows) + 1
         
         # Calculate curve offset based on position in the group
         base_offset = 30  # Base curve distance
         
-        # First check if any arrows share both domain and codomain (same endpoints)
+        # First check if any arrows share both domain and codomain (same endpoints),
+        # splitting the parallel arrows in one pass on their unordered endpoint pair
+        my_endpoints = frozenset((self._start_node, self._end_node))
         same_endpoints_arrows = []
+        non_same_endpoint_arrows = []
         for arrow in parallel_arrows:
-            if ((self._start_node == arrow._start_node and self._end_node == arrow._end_node) or
-                (self._start_node == arrow._end_node and self._end_node == arrow._start_node)):
+            if frozenset((arrow._start_node, arrow._end_node)) == my_endpoints:
                 same_endpoints_arrows.append(arrow)
+            else:
+                non_same_endpoint_arrows.append(arrow)
         
         if same_endpoints_arrows:
             # Special case: arrows sharing both endpoints should curve in opposite directions
-            same_endpoints_group = [self] + same_endpoints_arrows
-            same_endpoints_group.sort(key=lambda x: id(x))  # Consistent ordering
-            
-            my_index = same_endpoints_group.index(self)
+            # Rank by memory address for consistent ordering
+            my_index = sum(1 for arrow in same_endpoints_arrows if id(arrow) < my_id)
+            group_size = len(same_endpoints_arrows) + 1
             
-            if len(same_endpoints_group) == 2:
+            if group_size == 2:
                 # Two arrows with same endpoints - curve in opposite directions
                 self._curve_offset = base_offset if my_index == 0 else -base_offset
             else:
                 # More than 2 arrows with same endpoints - spread them out symmetrically
-                center_index = (len(same_endpoints_group) - 1) / 2
+                center_index = (group_size - 1) / 2
                 offset_multiplier = (my_index - center_index)
                 self._curve_offset = offset_multiplier * base_offset
             
@@ -839,13 +1303,6 @@ class Arrow(Node):
             
         else:
             # For arrows that don't share both endpoints, only curve if they would visually overlap
-            non_same_endpoint_arrows = []
-            for arrow in parallel_arrows:
-                # Skip arrows that share both endpoints (already handled above)
-                if not ((self._start_node == arrow._start_node and self._end_node == arrow._end_node) or
-                        (self._start_node == arrow._end_node and self._end_node == arrow._start_node)):
-                    non_same_endpoint_arrows.append(arrow)
-            
             # Check if we would actually visually overlap with these arrows
             if not self._arrows_would_visually_overlap(non_same_endpoint_arrows):
                 # No visual overlap - don't curve
@@ -857,28 +1314,19 @@ class Arrow(Node):
             # Check if remaining arrows are pointing in roughly the same direction
             same_direction_group = True
             if len(non_same_endpoint_arrows) > 0:
-                my_vector = self._get_arrow_line()['vector']
+                my_line = self._get_arrow_line()
                 for other_arrow in non_same_endpoint_arrows:
-                    other_vector = other_arrow._get_arrow_line()['vector']
-                    dot_product = my_vector.x() * other_vector.x() + my_vector.y() * other_vector.y()
+                    other_line = other_arrow._get_arrow_line()
+                    dot_product = my_line.dx() * other_line.dx() + my_line.dy() * other_line.dy()
                     if dot_product < 0:  # Opposite directions
                         same_direction_group = False
                         break
             
             if same_direction_group:
                 # All arrows point in the same general direction - curve them all to the same side
-                # Use a consistent direction for all arrows in the group
-                direction_vector = self._get_arrow_line()['vector']
-                
-                # Calculate perpendicular direction (rotate 90 degrees)
-                perp_x = -direction_vector.y()
-                perp_y = direction_vector.x()
-                
-                # Normalize the perpendicular vector
-                perp_length = math.sqrt(perp_x * perp_x + perp_y * perp_y)
-                if perp_length > 0:
-                    perp_x /= perp_length
-                    perp_y /= perp_length
+                # Use a consistent direction for all arrows in the group:
+                # the unit perpendicular (rotated 90 degrees) of this arrow's line
+                perp_x, perp_y = self._get_unit_perp()
                 
                 # Use a consistent offset direction (always curve "up" relative to arrow direction)
                 # Offset each arrow by increasing amounts
@@ -890,14 +1338,16 @@ class Arrow(Node):
             else:
                 # Mixed directions - use the old logic for opposite direction handling
                 if total_arrows == 2:
-                    other_arrow = parallel_arrows[0]
-                    if self._arrows_point_opposite_directions(other_arrow):
+                    # Specialized from _arrows_point_opposite_directions and
+                    # _get_direction_factor, on lines fetched once
+                    my_line = self._get_arrow_line()
+                    other_line = parallel_arrows[0]._get_arrow_line()
+                    my_dx, my_dy = my_line.dx(), my_line.dy()
+                    other_dx, other_dy = other_line.dx(), other_line.dy()
+                    if my_dx * other_dx + my_dy * other_dy < 0:
                         # Opposite directions: curve away from each other
-                        my_direction_factor = self._get_direction_factor()
-                        other_direction_factor = other_arrow._get_direction_factor()
-                        
                         # Use direction to determine which way to curve
-                        if my_direction_factor > other_direction_factor:
+                        if my_dx + my_dy * 1000 > other_dx + other_dy * 1000:
                             self._curve_offset = base_offset
                         else:
                             self._curve_offset = -base_offset
@@ -927,48 +1377,55 @@ class Arrow(Node):
         if not self._is_curved or not self._start_point or not self._end_point:
             return
         
-        # Calculate the midpoint and perpendicular direction
-        mid_x = (self._start_point.x() + self._end_point.x()) / 2
-        mid_y = (self._start_point.y() + self._end_point.y()) / 2
+        # Control points only depend on these, so skip the rebuild during
+        # drags that leave the curve unchanged
+        start_x, start_y = self._start_point.x(), self._start_point.y()
+        end_x, end_y = self._end_point.x(), self._end_point.y()
+        curve_direction = getattr(self, '_curve_direction', None)
+        inputs = (start_x, start_y, end_x, end_y, self._curve_offset, curve_direction)
+        if inputs == self._bezier_inputs:
+            return
+        self._bezier_inputs = inputs
+        
+        # Calculate direction vector; everything stays in floats until the
+        # control points themselves are built
+        dx = end_x - start_x
+        dy = end_y - start_y
         
         # Use stored curve direction if available, otherwise calculate it
-        if hasattr(self, '_curve_direction') and self._curve_direction is not None:
-            perp_dx, perp_dy = self._curve_direction
+        if curve_direction is not None:
+            perp_dx, perp_dy = curve_direction
         else:
-            # Calculate direction vector
-            dx = self._end_point.x() - self._start_point.x()
-            dy = self._end_point.y() - self._start_point.y()
-            
             # Calculate perpendicular vector (rotate 90 degrees)
             perp_dx = -dy
             perp_dy = dx
             
             # Normalize perpendicular vector
-            length = math.sqrt(perp_dx * perp_dx + perp_dy * perp_dy)
+            length = math.hypot(perp_dx, perp_dy)
             if length > 0:
-                perp_dx /= length
-                perp_dy /= length
+                inv_length = 1.0 / length
+                perp_dx *= inv_length
+                perp_dy *= inv_length
         
         # Apply curve offset
         offset_x = perp_dx * self._curve_offset
         offset_y = perp_dy * self._curve_offset
         
-        # Calculate direction vector for control point placement
-        dx = self._end_point.x() - self._start_point.x()
-        dy = self._end_point.y() - self._start_point.y()
-        
         # Control points at 1/3 and 2/3 along the line, offset perpendicular
         t1, t2 = 0.3, 0.7
         
         self._control_point_1 = QPointF(
-            self._start_point.x() + t1 * dx + offset_x,
-            self._start_point.y() + t1 * dy + offset_y
+            start_x + t1 * dx + offset_x,
+            start_y + t1 * dy + offset_y
         )
         
         self._control_point_2 = QPointF(
-            self._start_point.x() + t2 * dx + offset_x,
-            self._start_point.y() + t2 * dy + offset_y
+            start_x + t2 * dx + offset_x,
+            start_y + t2 * dy + offset_y
         )
+        
+        # Control points moved, so the retained bezier path is stale
+        self._cached_path = None
     
     def _get_edge_intersection(self, center, target_center, node):
         """Calculate the intersection point where the line from center to target_center intersects the node's rounded boundary."""
@@ -977,14 +1434,6 @@ class Arrow(Node):
         node_pos = node.pos()
         corner_radius = getattr(node, '_corner_radius', 10)  # Default to 10 if not found
         
-        # Convert to scene coordinates
-        scene_rect = QRectF(
-            node_pos.x() + rect.x(),
-            node_pos.y() + rect.y(),
-            rect.width(),
-            rect.height()
-        )
-        
         # Calculate direction vector from center to target
         dx = target_center.x() - center.x()
         dy = target_center.y() - center.y()
@@ -993,42 +1442,40 @@ class Arrow(Node):
         if abs(dx) < 0.001 and abs(dy) < 0.001:
             return center
         
-        # Create rounded rectangle path and convert to line segments
-        line_segments = self._get_rounded_rect_segments(scene_rect, corner_radius)
+        # Intersect the rounded boundary analytically when the ray starts
+        # inside the node, which it does for node centers
+        hit = _ray_rounded_rect_hit(
+            center.x(), center.y(), dx, dy,
+            node_pos.x() + rect.left(), node_pos.y() + rect.top(),
+            node_pos.x() + rect.right(), node_pos.y() + rect.bottom(),
+            corner_radius
+        )
+        if hit is not None:
+            return QPointF(hit[0], hit[1])
+        
+        # Otherwise fall back to the flattened outline. The boundary segments
+        # only depend on the node's local rect, so work in node coordinates
+        # where they can be shared between calls
+        line_segments = self._get_rounded_rect_segments(rect, corner_radius)
         
         # Find the closest point on the boundary to the line from center to target_center
-        closest_point = self._find_closest_point_on_boundary(center, target_center, line_segments)
+        closest_point = self._find_closest_point_on_boundary(
+            center - node_pos, target_center - node_pos, line_segments
+        )
         
-        return closest_point
+        return closest_point + node_pos
     
     def _get_rounded_rect_segments(self, rect, corner_radius):
-        """Convert a rounded rectangle into a list of line segments."""
-        from PyQt6.QtGui import QPainterPath
-        
-        # Create rounded rectangle path
-        path = QPainterPath()
-        path.addRoundedRect(rect, corner_radius, corner_radius)
-        
-        # Convert path to polygons (line segments)
-        segments = []
-        polygon = path.toFillPolygon()
-        
-        # Convert polygon points to line segments
-        for i in range(len(polygon) - 1):
-            segments.append((polygon[i], polygon[i + 1]))
-        
-        # Close the path if needed
-        if len(polygon) > 0:
-            segments.append((polygon[-1], polygon[0]))
-        
-        return segments
+        """Convert a rounded rectangle into (x1, y1, x2, y2) line segments."""
+        return _rounded_rect_segments(rect.x(), rect.y(), rect.width(), rect.height(), corner_radius)
     
-    def _find_closest_point_on_boundary(self, center, target_center, line_segments):
+    def _find_closest_point_on_boundary(self, center, target_center, line_segments,
+                                        _sqrt=math.sqrt, _QPointF=QPointF):
         """Find the closest point on the boundary segments to the line from center to target_center."""
         # Calculate direction vector from center to target
         dx = target_center.x() - center.x()
         dy = target_center.y() - center.y()
-        length = math.sqrt(dx * dx + dy * dy)
+        length = _sqrt(dx * dx + dy * dy)
         
         if length == 0:
             return center
@@ -1037,32 +1484,36 @@ class Arrow(Node):
         dx_norm = dx / length
         dy_norm = dy / length
         
-        closest_point = center
-        min_distance = float('inf')
-        
-        # Check intersection with each line segment
-        for segment_start, segment_end in line_segments:
-            # Find intersection of ray from center with this line segment
-            intersection = self._line_segment_intersection(
-                center, QPointF(center.x() + dx_norm * 1000, center.y() + dy_norm * 1000),
-                segment_start, segment_end
-            )
+        # The ray from center towards the target, cut off far past the node
+        x1, y1 = center.x(), center.y()
+        x2 = x1 + dx_norm * 1000
+        y2 = y1 + dy_norm * 1000
+        x12 = x1 - x2
+        y12 = y1 - y2
+        
+        # Solve each segment against the ray parametrically, x1 + t * (x2 - x1),
+        # with the same math as _line_segment_intersection.  The ray direction
+        # is a fixed multiple of the unit direction, so the nearest hit in the
+        # target's direction is simply the smallest positive t; only that
+        # point is ever built.
+        best_t = float('inf')
+        for x3, y3, x4, y4 in line_segments:
+            denominator = x12 * (y3 - y4) - y12 * (x3 - x4)
+            if abs(denominator) < 1e-10:
+                continue  # Lines are parallel
             
-            if intersection:
-                # Check if this intersection is in the correct direction
-                to_intersection_x = intersection.x() - center.x()
-                to_intersection_y = intersection.y() - center.y()
-                
-                # Check if intersection is in the same direction as target
-                dot_product = to_intersection_x * dx_norm + to_intersection_y * dy_norm
-                
-                if dot_product > 0:  # Same direction
-                    distance = math.sqrt(to_intersection_x ** 2 + to_intersection_y ** 2)
-                    if distance < min_distance:
-                        min_distance = distance
-                        closest_point = intersection
+            # Only check if intersection is on the boundary segment
+            u = -(x12 * (y1 - y3) - y12 * (x1 - x3)) / denominator
+            if not 0 <= u <= 1:
+                continue
+            
+            t = ((x1 - x3) * (y3 - y4) - (y1 - y3) * (x3 - x4)) / denominator
+            if 0 < t < best_t:
+                best_t = t
         
-        return closest_point
+        if best_t == float('inf'):
+            return center
+        return _QPointF(x1 + best_t * (x2 - x1), y1 + best_t * (y2 - y1))
     
     def _line_segment_intersection(self, p1, p2, p3, p4):
         """Find intersection point of two line segments (p1-p2 and p3-p4)."""
@@ -1089,40 +1540,63 @@ class Arrow(Node):
     
     def set_start_point(self, point):
         """Set the start point of the arrow."""
-        self.prepareGeometryChange()
+        self._invalidate_geometry()
         self._start_point = point
+        self._cached_path = None
+        self._angle = None
+        self._note_geometry_change()
         self.update()
     
     def set_end_point(self, point):
         """Set the end point of the arrow."""
-        self.prepareGeometryChange()
+        self._invalidate_geometry()
         self._end_point = point
+        self._cached_path = None
+        self._angle = None
+        self._note_geometry_change()
         self.update()
     
+    def _rebind(self, node, connect):
+        """Connect (or disconnect) node's movement and name signals to this arrow."""
+        if not node:
+            return
+        if connect:
+            node.node_moved.connect(self._queue_position_update)
+        else:
+            node.node_moved.disconnect(self._queue_position_update)
+        # Name changes update label visibility
+        name_changed = getattr(node, 'name_changed', None)
+        if name_changed is not None:
+            if connect:
+                name_changed.connect(self._update_label_visibility)
+            else:
+                name_changed.disconnect(self._update_label_visibility)
+    
     def set_nodes(self, start_node, end_node):
         """Set the connected nodes."""
         # Disconnect from old nodes
-        if self._start_node:
-            self._start_node.node_moved.disconnect(self.update_position)
-            if hasattr(self._start_node, 'name_changed'):
-                self._start_node.name_changed.disconnect(self._update_label_visibility)
-        if self._end_node:
-            self._end_node.node_moved.disconnect(self.update_position)
-            if hasattr(self._end_node, 'name_changed'):
-                self._end_node.name_changed.disconnect(self._update_label_visibility)
+        self._rebind(self._start_node, False)
+        self._rebind(self._end_node, False)
+        
+        # Keep the scene's node -> arrows index in step with the new endpoints
+        scene = self.scene()
+        if scene is not None and hasattr(scene, '_unindex_arrow'):
+            scene._unindex_arrow(self)
         
         # Connect to new nodes
         self._start_node = start_node
         self._end_node = end_node
+        self._line_cache = None
+        
+        self._rebind(self._start_node, True)
+        self._rebind(self._end_node, True)
         
-        if self._start_node:
-            self._start_node.node_moved.connect(self.update_position)
-            if hasattr(self._start_node, 'name_changed'):
-                self._start_node.name_changed.connect(self._update_label_visibility)
-        if self._end_node:
-            self._end_node.node_moved.connect(self.update_position)
-            if hasattr(self._end_node, 'name_changed'):
-                self._end_node.name_changed.connect(self._update_label_visibility)
+        if scene is not None and hasattr(scene, '_index_arrow'):
+            scene._index_arrow(self)
+        
+        # Rewiring an arrow changes scene geometry just like a node move
+        if scene is not None and hasattr(scene, '_change_counter'):
+            scene._change_counter += 1
             
         self.update_position()
         
@@ -1131,22 +1605,37 @@ class Arrow(Node):
     
     def type(self):
         """Return the type identifier for this item."""
-        return QGraphicsItem.UserType + 2
+        return self.Type
     
-    def _draw_arrow_tail(self, painter, angle):
-        """Draw the arrow tail based on style."""
+    def _draw_arrow_tail(self, painter, angle, cos_a=None, sin_a=None):
+        """Draw the arrow tail based on style.
+        
+        Either angle or cos_a/sin_a may be left as None; the other is used.
+        """
         # Inclusion takes precedence over monomorphism
         if self._is_inclusion:
+            if angle is None:
+                angle = math.atan2(sin_a, cos_a)
             self._draw_hook_tail(painter, angle)
         elif self._is_monomorphism:
-            self._draw_vee_tail(painter, angle)
+            if cos_a is None:
+                cos_a = math.cos(angle)
+                sin_a = math.sin(angle)
+            self._draw_vee_tail(painter, cos_a, sin_a)
     
-    def _draw_arrow_head(self, painter, angle):
-        """Draw the arrow head based on style."""
+    def _draw_arrow_head(self, painter, angle, cos_a=None, sin_a=None):
+        """Draw the arrow head based on style.
+        
+        cos_a/sin_a may be passed in when the caller already has them.
+        """
+        if cos_a is None:
+            cos_a = math.cos(angle)
+            sin_a = math.sin(angle)
+        
         if self._is_epimorphism:
-            self._draw_two_head(painter, angle)
+            self._draw_two_head(painter, cos_a, sin_a)
         else:
-            self._draw_normal_head(painter, angle)
+            self._draw_normal_head(painter, cos_a, sin_a)
     
     def _draw_hook_tail(self, painter, angle):
         """Draw hook tail for inclusion arrows using rotation and translation approach."""
@@ -1188,52 +1677,48 @@ class Arrow(Node):
         # Restore the painter state
         painter.restore()
     
-    def _draw_vee_tail(self, painter, angle):
+    def _draw_vee_tail(self, painter, cos_a, sin_a):
         """Draw vee tail for monomorphism arrows."""
         vee_size = self._arrow_head_size
+        start_x, start_y = self._start_point.x(), self._start_point.y()
         
-        # Vee points
+        # Vee points at angle -/+ pi/6 via the angle-addition identities
         vee_p1 = QPointF(
-            self._start_point.x() + vee_size * math.cos(angle - math.pi / 6),
-            self._start_point.y() + vee_size * math.sin(angle - math.pi / 6)
+            start_x + vee_size * (cos_a * _COS_PI_6 + sin_a * _SIN_PI_6),
+            start_y + vee_size * (sin_a * _COS_PI_6 - cos_a * _SIN_PI_6)
         )
         vee_p2 = QPointF(
-            self._start_point.x() + vee_size * math.cos(angle + math.pi / 6),
-            self._start_point.y() + vee_size * math.sin(angle + math.pi / 6)
+            start_x + vee_size * (cos_a * _COS_PI_6 - sin_a * _SIN_PI_6),
+            start_y + vee_size * (sin_a * _COS_PI_6 + cos_a * _SIN_PI_6)
         )
         
         # Draw vee tail
         painter.drawLine(self._start_point, vee_p1)
         painter.drawLine(self._start_point, vee_p2)
     
-    def _draw_two_head(self, painter, angle):
+    def _draw_two_head(self, painter, cos_a, sin_a):
         """Draw double arrow head for epimorphism arrows."""
         head_size = self._arrow_head_size
         offset_distance = head_size * 0.6
         
+        # Wing offsets at angle -/+ pi/8 via the angle-addition identities,
+        # shared by both heads
+        wing1_x = head_size * (cos_a * _COS_PI_8 + sin_a * _SIN_PI_8)
+        wing1_y = head_size * (sin_a * _COS_PI_8 - cos_a * _SIN_PI_8)
+        wing2_x = head_size * (cos_a * _COS_PI_8 - sin_a * _SIN_PI_8)
+        wing2_y = head_size * (sin_a * _COS_PI_8 + cos_a * _SIN_PI_8)
+        end_x, end_y = self._end_point.x(), self._end_point.y()
+        
         # First arrow head (at tip)
-        arrow1_p1 = QPointF(
-            self._end_point.x() - head_size * math.cos(angle - math.pi / 8),
-            self._end_point.y() - head_size * math.sin(angle - math.pi / 8)
-        )
-        arrow1_p2 = QPointF(
-            self._end_point.x() - head_size * math.cos(angle + math.pi / 8),
-            self._end_point.y() - head_size * math.sin(angle + math.pi / 8)
-        )
+        arrow1_p1 = QPointF(end_x - wing1_x, end_y - wing1_y)
+        arrow1_p2 = QPointF(end_x - wing2_x, end_y - wing2_y)
         
         # Second arrow head (offset back)
-        head2_center = QPointF(
-            self._end_point.x() - offset_distance * math.cos(angle),
-            self._end_point.y() - offset_distance * math.sin(angle)
-        )
-        arrow2_p1 = QPointF(
-            head2_center.x() - head_size * math.cos(angle - math.pi / 8),
-            head2_center.y() - head_size * math.sin(angle - math.pi / 8)
-        )
-        arrow2_p2 = QPointF(
-            head2_center.x() - head_size * math.cos(angle + math.pi / 8),
-            head2_center.y() - head_size * math.sin(angle + math.pi / 8)
-        )
+        head2_x = end_x - offset_distance * cos_a
+        head2_y = end_y - offset_distance * sin_a
+        head2_center = QPointF(head2_x, head2_y)
+        arrow2_p1 = QPointF(head2_x - wing1_x, head2_y - wing1_y)
+        arrow2_p2 = QPointF(head2_x - wing2_x, head2_y - wing2_y)
         
         # Draw both arrow heads
         painter.drawLine(self._end_point, arrow1_p1)
@@ -1241,15 +1726,16 @@ class Arrow(Node):
         painter.drawLine(head2_center, arrow2_p1)
         painter.drawLine(head2_center, arrow2_p2)
     
-    def _draw_normal_head(self, painter, angle):
+    def _draw_normal_head(self, painter, cos_a, sin_a):
         """Draw normal single arrow head."""
+        # Wing directions at angle -/+ pi/8 via the angle-addition identities
         arrow_p1 = QPointF(
-            self._end_point.x() - self._arrow_head_size * math.cos(angle - math.pi / 8),
-            self._end_point.y() - self._arrow_head_size * math.sin(angle - math.pi / 8)
+            self._end_point.x() - self._arrow_head_size * (cos_a * _COS_PI_8 + sin_a * _SIN_PI_8),
+            self._end_point.y() - self._arrow_head_size * (sin_a * _COS_PI_8 - cos_a * _SIN_PI_8)
         )
         arrow_p2 = QPointF(
-            self._end_point.x() - self._arrow_head_size * math.cos(angle + math.pi / 8),
-            self._end_point.y() - self._arrow_head_size * math.sin(angle + math.pi / 8)
+            self._end_point.x() - self._arrow_head_size * (cos_a * _COS_PI_8 - sin_a * _SIN_PI_8),
+            self._end_point.y() - self._arrow_head_size * (sin_a * _COS_PI_8 + cos_a * _SIN_PI_8)
         )
         
         # Draw V-shape arrow head with two lines
@@ -1265,7 +1751,10 @@ class Arrow(Node):
     def set_text(self, text):
         """Set the text displayed on the arrow."""
         old_text = self._text
+        # The label is part of the bounding rect
+        self._invalidate_geometry()
         self._text = text
+        self._invalidate_serialized()
         self.update()
         
         # Emit signal if text actually changed
@@ -1301,10 +1790,12 @@ class Arrow(Node):
                 
         return False
     
+    @pyqtSlot()
     def _update_label_visibility(self):
         """Update label visibility based on current conditions."""
         should_hide = self._should_hide_label()
         if self._label_visible == should_hide:  # Need to toggle
+            self._invalidate_geometry()  # The label is part of the bounding rect
             self._label_visible = not should_hide
             self.update()  # Trigger repaint
     
@@ -1371,6 +1862,7 @@ class Arrow(Node):
     
     def toggle_label_visibility(self):
         """Toggle manual label visibility."""
+        self._invalidate_geometry()  # The label is part of the bounding rect
         self._label_manually_hidden = not self._label_manually_hidden
         self.update()  # Trigger repaint
     
@@ -1391,23 +1883,30 @@ class Arrow(Node):
     
     def _update_style(self):
         """Update arrow appearance based on style settings."""
+        # The inclusion hook tail widens the bounding rect
+        self._invalidate_geometry()
+        self._invalidate_serialized()
         self.update()  # Trigger repaint
     
     def _update_pen_style(self):
         """Update the pen style based on the 'There Exists' state."""
-        from PyQt6.QtCore import Qt
-        
-        if self._there_exists:
-            # Create dashed pen
+        # Both variants are made once per solid pen and reused on every toggle
+        if self._pen_variants is None or self._pen_variants[0] is not self._solid_pen:
             dashed_pen = QPen(self._solid_pen)
             dashed_pen.setStyle(Qt.PenStyle.DashLine)
-            self._pen = dashed_pen
+            self._pen_variants = (self._solid_pen, QPen(self._solid_pen), dashed_pen)
+        
+        if self._there_exists:
+            # Use dashed pen
+            self._pen = self._pen_variants[2]
         else:
             # Use solid pen
-            self._pen = QPen(self._solid_pen)
+            self._pen = self._pen_variants[1]
         
         # Update original pen for highlight restoration
         self._original_pen = self._pen
+        self._invalidate_geometry()
+        self._invalidate_serialized()
     
     def get_source(self):
         """Get the source node of the arrow."""
@@ -1429,107 +1928,81 @@ class Arrow(Node):
     
     def contextMenuEvent(self, event):
         """Handle right-click context menu."""
+        # Menus are built once per arrow and only their check states are
+        # refreshed; kernel arrows get a reduced set of style options
+        if self.is_kernel_arrow():
+            if self._kernel_context_menu is None:
+                self._kernel_context_menu = self._build_context_menu(self._KERNEL_STYLE_ACTIONS)
+            menu, actions = self._kernel_context_menu
+        else:
+            if self._context_menu is None:
+                self._context_menu = self._build_context_menu(self._REGULAR_STYLE_ACTIONS)
+            menu, actions = self._context_menu
+        
+        actions['hide_label'].setChecked(self._label_manually_hidden)
+        actions['there_exists'].setChecked(self._there_exists)
+        for action, attr in actions['styles']:
+            action.setChecked(getattr(self, attr))
+        
+        # Show the menu at the cursor position
+        menu.exec(event.screenPos())
+    
+    def _add_menu_action(self, menu, text, slot=None, checkable=False):
+        """Add an action to menu, connected to slot if given, and return it."""
+        action = QAction(text, menu)
+        action.setCheckable(checkable)
+        if slot is not None:
+            action.triggered.connect(slot)
+        menu.addAction(action)
+        return action
+    
+    def _build_context_menu(self, style_actions):
+        """Build the context menu, with one checkable entry per row of style_actions."""
         menu = QMenu()
+        actions = {'styles': []}
         
         # Add "Edit Name" action
-        edit_name_action = QAction("✏️ Edit Name", menu)
-        edit_name_action.triggered.connect(self.edit_name)
-        menu.addAction(edit_name_action)
+        self._add_menu_action(menu, "✏️ Edit Name", self.edit_name)
         
         # Add "Hide Label" toggle action
-        hide_label_action = QAction("👁️‍🗨️ Hide Label", menu)
-        hide_label_action.setCheckable(True)
-        hide_label_action.setChecked(self._label_manually_hidden)
-        hide_label_action.triggered.connect(self.toggle_label_visibility)
-        menu.addAction(hide_label_action)
+        actions['hide_label'] = self._add_menu_action(
+            menu, "👁️‍🗨️ Hide Label", self.toggle_label_visibility, checkable=True)
         
         # Add "Flip Arrow" action
-        flip_action = QAction("🔄 Flip Arrow", menu)
-        flip_action.triggered.connect(self.flip_arrow)
-        menu.addAction(flip_action)
+        self._add_menu_action(menu, "🔄 Flip Arrow", self.flip_arrow)
         
         # Add separator
         menu.addSeparator()
         
         # Add "There Exists" toggle action
-        there_exists_action = QAction("∃ There Exists", menu)
-        there_exists_action.setCheckable(True)
-        there_exists_action.setChecked(self._there_exists)
-        there_exists_action.triggered.connect(self.toggle_there_exists)
-        menu.addAction(there_exists_action)
+        actions['there_exists'] = self._add_menu_action(
+            menu, "∃ There Exists", self.toggle_there_exists, checkable=True)
         
         # Add separator for arrow styles
         menu.addSeparator()
         
-        # Different menu options for kernel arrows vs regular arrows
-        if self.is_kernel_arrow():
-            # For kernel arrows, only show Inclusion (checked and disabled), Isomorphism, and Epimorphism
-            inclusion_action = QAction("🔗 Inclusion", menu)
-            inclusion_action.setCheckable(True)
-            inclusion_action.setChecked(True)  # Always checked for kernel arrows
-            inclusion_action.setEnabled(False)  # Disabled - cannot be changed
-            menu.addAction(inclusion_action)
-            
-            isomorphism_action = QAction("↔️ Isomorphism", menu)
-            isomorphism_action.setCheckable(True)
-            isomorphism_action.setChecked(self._is_isomorphism)
-            isomorphism_action.triggered.connect(self.toggle_isomorphism)
-            menu.addAction(isomorphism_action)
-            
-            epimorphism_action = QAction("⤠ Epimorphism", menu)
-            epimorphism_action.setCheckable(True)
-            epimorphism_action.setChecked(self._is_epimorphism)
-            epimorphism_action.triggered.connect(self.toggle_epimorphism)
-            menu.addAction(epimorphism_action)
-            
-        else:
-            # For regular arrows, show all arrow style toggles
-            inclusion_action = QAction("🔗 Inclusion", menu)
-            inclusion_action.setCheckable(True)
-            inclusion_action.setChecked(self._is_inclusion)
-            inclusion_action.triggered.connect(self.toggle_inclusion)
-            menu.addAction(inclusion_action)
-            
-            monomorphism_action = QAction("↪️ Monomorphism", menu)
-            monomorphism_action.setCheckable(True)
-            monomorphism_action.setChecked(self._is_monomorphism)
-            monomorphism_action.triggered.connect(self.toggle_monomorphism)
-            menu.addAction(monomorphism_action)
-            
-            epimorphism_action = QAction("⤠ Epimorphism", menu)
-            epimorphism_action.setCheckable(True)
-            epimorphism_action.setChecked(self._is_epimorphism)
-            epimorphism_action.triggered.connect(self.toggle_epimorphism)
-            menu.addAction(epimorphism_action)
-            
-            isomorphism_action = QAction("↔️ Isomorphism", menu)
-            isomorphism_action.setCheckable(True)
-            isomorphism_action.setChecked(self._is_isomorphism)
-            isomorphism_action.triggered.connect(self.toggle_isomorphism)
-            menu.addAction(isomorphism_action)
-            
-            general_action = QAction("➡️ General Arrow", menu)
-            general_action.setCheckable(True)
-            general_action.setChecked(self._is_general)
-            general_action.triggered.connect(self.toggle_general)
-            menu.addAction(general_action)
+        for label, attr, slot_name in style_actions:
+            if attr is None:
+                # Fixed style: always checked and cannot be changed
+                action = self._add_menu_action(menu, label, checkable=True)
+                action.setChecked(True)
+                action.setEnabled(False)
+            else:
+                action = self._add_menu_action(
+                    menu, label, getattr(self, slot_name), checkable=True)
+                actions['styles'].append((action, attr))
         
         # Add separator
         menu.addSeparator()
         
         # Add "Delete" action
-        delete_action = QAction("🗑️ Delete", menu)
-        delete_action.triggered.connect(self.delete_arrow)
-        menu.addAction(delete_action)
-        
-        # Show the menu at the cursor position
-        menu.exec(event.screenPos())
+        self._add_menu_action(menu, "🗑️ Delete", self.delete_arrow)
+        return menu, actions
     
     def edit_name(self):
         """Open the rename dialog to edit the arrow's name."""
         from dialog.arrow_rename_dialog import ArrowRenameDialog
         from core.undo_commands import RenameArrow
-        from PyQt6.QtWidgets import QApplication
         
         dialog = ArrowRenameDialog(self._text, self.scene().views()[0])
         if dialog.exec() == dialog.DialogCode.Accepted:
@@ -1543,38 +2016,43 @@ class Arrow(Node):
                     # Regular rename - just this arrow
                     command = RenameArrow(self, self._text, new_name)
                 
-                app = QApplication.instance()
-                app.undo_stack.push(command)
+                undo_stack().push(command)
     
     def delete_arrow(self):
         """Delete this arrow."""
         from core.undo_commands import DeleteItems
-        from PyQt6.QtWidgets import QApplication
         
         command = DeleteItems(self.scene(), [self])
-        app = QApplication.instance()
-        app.undo_stack.push(command)
+        undo_stack().push(command)
     
     def flip_arrow(self):
         """Flip the direction of this arrow by swapping source and target."""
         from core.undo_commands import FlipArrowCommand
-        from PyQt6.QtWidgets import QApplication
         
         command = FlipArrowCommand(self)
-        app = QApplication.instance()
-        app.undo_stack.push(command)
+        undo_stack().push(command)
     
     def set_highlight_color(self, color):
         """Set highlight color for cycle detection."""
+        # The highlight pen is thicker, which changes the bounding rectangle
+        self._invalidate_geometry()
         self._highlight_color = color
         if color:
-            # Create highlighted pen and brush
-            self._pen = QPen(color, 4)  # Thicker red line
-            self._brush = QBrush(color)  # Red arrowhead
+            # Look up (or create) the shared highlighted pen and brush
+            rgba = color.rgba()
+            pen = Arrow._highlight_pen_cache.get((rgba, 4))
+            if pen is None:
+                pen = Arrow._highlight_pen_cache[(rgba, 4)] = QPen(color, 4)  # Thicker red line
+            brush = Arrow._highlight_brush_cache.get(rgba)
+            if brush is None:
+                brush = Arrow._highlight_brush_cache[rgba] = QBrush(color)  # Red arrowhead
+            self._pen = pen
+            self._brush = brush
         else:
             # Restore original colors
             self._pen = self._original_pen
             self._brush = self._original_brush
+        self._invalidate_serialized()
         self.update()
     
     def clear_highlight_color(self):
@@ -41,6 +41,34 @@ class DiagramScene(QGraphicsScene):
         # Arrow naming counter (starts at 0 for 'a')
         self._arrow_counter = 0
         
+        # Bumped whenever a node is added, removed or moved so that
+        # geometry caches on items can tell when they are stale
+        self._change_counter = 0
+        
+        # Bumped whenever an arrow's outline changes without any node moving
+        self._arrow_change_counter = 0
+        
+        # Last SessionManager.serialize_diagram_scene result as (change counter,
+        # data); any repaint may reflect an edit, so scene changes drop it
+        self._serialized = None
+        self.changed.connect(self._drop_serialized)
+        
+        # Arrows waiting to be repositioned after node moves; flushed once
+        # per event loop pass so a drag step updates each arrow only once
+        self._pending_arrow_updates = set()
+        self._arrow_flush_scheduled = False
+        
+        # Arrows in the scene, also indexed by the nodes they connect and by
+        # their (unordered) endpoint pair
+        self._arrows = set()
+        self._arrows_by_node = {}
+        self._arrows_by_endpoint = {}
+        
+        # Objects in the scene, so counting them needs no scan of items(), also
+        # indexed by the snap grid intersection they sit on (Node.grid_cell)
+        self._objects = set()
+        self._objects_by_cell = {}
+        
         # Cycle detection
         self._cycle_detector = CycleDetector()
         self._highlighted_cycles = []  # Track currently highlighted cycles
@@ -90,16 +118,106 @@ class DiagramScene(QGraphicsScene):
     
     def addItem(self, item):
         """Override addItem to trigger cycle detection."""
+        from .arrow import Arrow
+        from .object_node import Object
+        
         super().addItem(item)
+        self._change_counter += 1
+        if isinstance(item, Arrow):
+            self._arrows.add(item)
+            self._index_arrow(item)
+        elif isinstance(item, Object):
+            self._objects.add(item)
+            self._index_object(item)
         # Schedule cycle detection after item is added
         QTimer.singleShot(100, self._detect_and_highlight_cycles)
     
     def removeItem(self, item):
         """Override removeItem to trigger cycle detection."""
+        from .arrow import Arrow
+        
         super().removeItem(item)
+        self._change_counter += 1
+        if isinstance(item, Arrow):
+            self._arrows.discard(item)
+            self._unindex_arrow(item)
+        elif item in self._objects:
+            self._objects.discard(item)
+            self._unindex_object(item)
         # Schedule cycle detection after item is removed
         QTimer.singleShot(100, self._detect_and_highlight_cycles)
     
+    def _drop_serialized(self, _regions):
+        """Forget the cached serialization after the scene has changed."""
+        self._serialized = None
+    
+    def _index_arrow(self, arrow):
+        """Record an arrow under each of the nodes it connects and its endpoint pair."""
+        source, target = arrow.get_source(), arrow.get_target()
+        for node in (source, target):
+            if node is not None:
+                self._arrows_by_node.setdefault(node, set()).add(arrow)
+        if source is not None and target is not None:
+            endpoints = frozenset((source, target))
+            self._arrows_by_endpoint.setdefault(endpoints, []).append(arrow)
+    
+    def _unindex_arrow(self, arrow):
+        """Drop an arrow from the node and endpoint indexes."""
+        source, target = arrow.get_source(), arrow.get_target()
+        for node in (source, target):
+            arrows = self._arrows_by_node.get(node)
+            if arrows is not None:
+                arrows.discard(arrow)
+                if not arrows:
+                    del self._arrows_by_node[node]
+        endpoints = frozenset((source, target))
+        arrows = self._arrows_by_endpoint.get(endpoints)
+        if arrows is not None and arrow in arrows:
+            arrows.remove(arrow)
+            if not arrows:
+                del self._arrows_by_endpoint[endpoints]
+    
+    def _index_object(self, obj):
+        """Record an object under the snap grid intersection of its position."""
+        obj._grid_cell = obj.grid_cell(obj.pos())
+        self._objects_by_cell.setdefault(obj._grid_cell, set()).add(obj)
+    
+    def _unindex_object(self, obj):
+        """Drop an object from the grid intersection index."""
+        objects = self._objects_by_cell.get(obj._grid_cell)
+        if objects is not None:
+            objects.discard(obj)
+            if not objects:
+                del self._objects_by_cell[obj._grid_cell]
+    
+    def queue_arrow_update(self, arrow):
+        """Schedule an arrow to be repositioned on the next event loop pass."""
+        self._pending_arrow_updates.add(arrow)
+        if not self._arrow_flush_scheduled:
+            self._arrow_flush_scheduled = True
+            QTimer.singleShot(0, self._flush_arrow_updates)
+    
+    def _flush_arrow_updates(self):
+        """Reposition every arrow queued since the last flush."""
+        from .arrow import Arrow
+        
+        self._arrow_flush_scheduled = False
+        pending = self._pending_arrow_updates
+        self._pending_arrow_updates = set()
+        
+        # Recheck only the arrows touching the moved nodes and their parallel groups
+        dirty_nodes = set()
+        for arrow in pending:
+            try:
+                if arrow.scene() is self:
+                    dirty_nodes.add(arrow.get_source())
+                    dirty_nodes.add(arrow.get_target())
+            except RuntimeError:
+                pass  # Arrow was deleted before the flush ran
+        dirty_nodes.discard(None)
+        
+        Arrow.update_parallel_arrows_in_scene(self, dirty_nodes)
+    
     def snap_to_grid(self, point):
         """Snap a point to the nearest grid intersection."""
         # Find the nearest grid intersection
@@ -413,6 +531,13 @@ class DiagramScene(QGraphicsScene):
     def clear(self):
         """Clear the scene and reset the node counter."""
         super().clear()
+        self._change_counter += 1
+        self._arrows.clear()
+        self._arrows_by_node.clear()
+        self._arrows_by_endpoint.clear()
+        self._objects.clear()
+        self._objects_by_cell.clear()
+        self._pending_arrow_updates.clear()
         self.reset_node_counter()
         self.reset_arrow_counter()
         self.cancel_arrow_creation()
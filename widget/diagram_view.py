@@ -1,15 +1,22 @@
 """
 Custom QGraphicsView for DAG diagrams.
 """
-from PyQt6.QtWidgets import QGraphicsView
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QWheelEvent
+from PyQt6.QtWidgets import QGraphicsView, QGraphicsScene, QMenu, QWidget
+from PyQt6.QtCore import Qt, QTimer, QPointF, QRectF
+from PyQt6.QtGui import QWheelEvent, QPainter, QMouseEvent, QSurfaceFormat, QImage
+from core.app import undo_stack
 from .proof_step_overlay import ProofStepOverlay
+from .arrow import Arrow
+from .object_node import Object
 
 
 class DiagramView(QGraphicsView):
     """Custom graphics view for DAG diagrams with zoom and pan capabilities."""
     
+    # Past this many items, keeping the BSP index up to date while objects
+    # and their arrows are dragged costs more than unindexed lookups
+    _NO_INDEX_ITEM_COUNT = 200
+    
     def __init__(self, scene=None, parent=None):
         super().__init__(scene, parent)
         
@@ -17,11 +24,22 @@ class DiagramView(QGraphicsView):
         self.setDragMode(QGraphicsView.DragMode.NoDrag)
         
         # Enable anti-aliasing
-        from PyQt6.QtGui import QPainter
         self.setRenderHint(QPainter.RenderHint.Antialiasing)
         
+        # Repaint the bounding rect of everything that changed instead of
+        # working out the exact exposed region, which is cheaper on drags
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.BoundingRectViewportUpdate)
+        
+        # Items set their own pen, brush and font before drawing, so Qt need
+        # not save and restore the painter around each one
+        self.setOptimizationFlag(QGraphicsView.OptimizationFlag.DontSavePainterState, True)
+        
+        # Plain raster viewport until set_opengl_viewport() switches it
+        self._opengl_viewport = False
+        
         # Zoom settings
         self._zoom_factor = 1.15
+        self._inv_zoom_factor = 1.0 / self._zoom_factor
         self._min_zoom = 0.1
         self._max_zoom = 5.0
         self._current_zoom = 1.0
@@ -33,6 +51,17 @@ class DiagramView(QGraphicsView):
         # Create proof step overlay
         self.proof_step_overlay = ProofStepOverlay(self, self)
         
+        # Last rendered thumbnail as (size, QImage), dropped when the scene changes
+        self._thumbnail_cache = None
+        
+        # Selection changes arrive once per toggled item (e.g. during a
+        # rubber-band drag); the overlay is only updated for the final state
+        self._selection_timer = QTimer(self)
+        self._selection_timer.setSingleShot(True)
+        self._selection_timer.setInterval(0)
+        self._selection_timer.timeout.connect(self._do_selection_update)
+        self._last_selection_fp = None  # (object ids, arrow ids, overlay shown) last handed to the overlay
+        
         # Connect to scene selection changes
         if scene:
             self.setScene(scene)
@@ -41,37 +70,55 @@ class DiagramView(QGraphicsView):
         # Set transformation anchor to mouse position for zoom
         self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
         
-        # Double-click detection
-        self._suppress_overlay_timer = None
+        # Double-click detection; the overlay stays suppressed for 100ms after one
         self._suppress_overlay = False
+        self._suppress_overlay_timer = QTimer(self)
+        self._suppress_overlay_timer.setSingleShot(True)
+        self._suppress_overlay_timer.setInterval(100)
+        self._suppress_overlay_timer.timeout.connect(self._clear_overlay_suppression)
+        
+        # Item drag state, set on left-click on an object
+        self._potential_drag_item = None
+        self._drag_start_pos = None
+        self._drag_start_view_pos = None
+        self._drag_inv_scale = (1.0, 1.0)  # View-to-scene scale while dragging
+        self._drag_start_item_pos = None
+        self._is_actually_dragging = False
+        self._drag_threshold = 5  # pixels
+        
+        # Canvas pan state, set on left-click on empty space
+        self._canvas_drag_start = None
+        self._is_canvas_dragging = False
+        self._canvas_drag_threshold = 5  # pixels
         
         # Proof buttons control - default disabled
         self._proof_buttons_enabled = False
         self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
         
         # Press and hold timer for context menu
-        from PyQt6.QtCore import QTimer
-        self._press_hold_timer = QTimer()
+        self._press_hold_duration = 500  # milliseconds
+        self._press_hold_timer = QTimer(self)
         self._press_hold_timer.setSingleShot(True)
+        self._press_hold_timer.setInterval(self._press_hold_duration)
         self._press_hold_timer.timeout.connect(self._show_context_menu)
-        self._press_hold_duration = 500  # milliseconds
         self._press_hold_pos = None
         
     def wheelEvent(self, event: QWheelEvent):
         """Handle mouse wheel events for zooming."""
-        # Get the angle delta
-        angle_delta = event.angleDelta().y()
-        
-        if angle_delta > 0:
-            # Zoom in
-            if self._current_zoom < self._max_zoom:
-                self.scale(self._zoom_factor, self._zoom_factor)
-                self._current_zoom *= self._zoom_factor
+        if event.angleDelta().y() > 0:
+            # Zoom in, unless already at the limit
+            if self._current_zoom >= self._max_zoom:
+                event.accept()
+                return
+            self.scale(self._zoom_factor, self._zoom_factor)
+            self._current_zoom *= self._zoom_factor
         else:
-            # Zoom out
-            if self._current_zoom > self._min_zoom:
-                self.scale(1 / self._zoom_factor, 1 / self._zoom_factor)
-                self._current_zoom /= self._zoom_factor
+            # Zoom out, unless already at the limit
+            if self._current_zoom <= self._min_zoom:
+                event.accept()
+                return
+            self.scale(self._inv_zoom_factor, self._inv_zoom_factor)
+            self._current_zoom *= self._inv_zoom_factor
     
     def mousePressEvent(self, event):
         """Handle mouse press events."""
@@ -79,35 +126,40 @@ class DiagramView(QGraphicsView):
         self._press_hold_timer.stop()
         
         # Check if the click is on the proof step overlay area
-        if hasattr(self, 'proof_step_overlay') and self.proof_step_overlay.isVisible():
+        if self.proof_step_overlay.isVisible():
             overlay_rect = self.proof_step_overlay.geometry()
             if overlay_rect.contains(event.pos()):
                 # Let the overlay handle the mouse event - don't interfere
                 super().mousePressEvent(event)
                 return
         
-        # Check if we clicked on an item first
+        # Check if we clicked on an item first. This is the only view-to-scene
+        # mapping per press (drags work on view-space deltas), and the view's
+        # one-pixel hit rectangle keeps thin arrows clickable where a scene
+        # point query would miss their edges
         item = self.itemAt(event.pos())
         
         if event.button() == Qt.MouseButton.LeftButton and item and hasattr(item, 'get_text'):
             # Left click on an object node - prepare for potential drag
             self._potential_drag_item = item
             self._drag_start_pos = event.pos()
-            self._drag_start_scene_pos = self.mapToScene(event.pos())
+            # The view transform is a pure scale, so moves only need the
+            # view-space delta scaled into the scene
+            self._drag_start_view_pos = event.position()
+            transform = self.transform()
+            self._drag_inv_scale = (1.0 / transform.m11(), 1.0 / transform.m22())
             self._drag_start_item_pos = item.pos()
             self._is_actually_dragging = False
-            self._drag_threshold = 5  # pixels
             # Allow normal selection to proceed first
             self.setDragMode(QGraphicsView.DragMode.NoDrag)
         elif event.button() == Qt.MouseButton.LeftButton and not item:
             # Left click on empty space - prepare for panning or context menu
             self._canvas_drag_start = event.pos()
             self._is_canvas_dragging = False
-            self._canvas_drag_threshold = 5  # pixels
             
             # Start press-hold timer for context menu
             self._press_hold_pos = event.pos()
-            self._press_hold_timer.start(self._press_hold_duration)
+            self._press_hold_timer.start()
             
             # Don't set drag mode yet - wait to see if it's a drag or hold
             self.setDragMode(QGraphicsView.DragMode.NoDrag)
@@ -133,14 +185,8 @@ class DiagramView(QGraphicsView):
         # Stop press-hold timer if mouse moves (it's a drag, not a hold)
         self._press_hold_timer.stop()
         
-        # Check if we have a potential canvas drag that hasn't started yet
-        if (hasattr(self, '_canvas_drag_start') and self._canvas_drag_start and 
-            not hasattr(self, '_is_canvas_dragging')):
-            self._is_canvas_dragging = False
-        
         # Check if we should start canvas panning
-        if (hasattr(self, '_canvas_drag_start') and self._canvas_drag_start and 
-            not self._is_canvas_dragging):
+        if self._canvas_drag_start is not None and not self._is_canvas_dragging:
             
             move_distance = (event.pos() - self._canvas_drag_start).manhattanLength()
             if move_distance > self._canvas_drag_threshold:
@@ -148,8 +194,6 @@ class DiagramView(QGraphicsView):
                 # Enable scroll hand drag for panning
                 self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
                 # Need to simulate a mouse press to start the drag
-                from PyQt6.QtGui import QMouseEvent
-                from PyQt6.QtCore import QPointF
                 press_event = QMouseEvent(
                     QMouseEvent.Type.MouseButtonPress,
                     QPointF(self._canvas_drag_start),
@@ -160,8 +204,7 @@ class DiagramView(QGraphicsView):
                 super().mousePressEvent(press_event)
         
         # Check if we have a potential item drag that hasn't started yet
-        if (hasattr(self, '_potential_drag_item') and self._potential_drag_item and 
-            not self._is_actually_dragging):
+        if self._potential_drag_item is not None and not self._is_actually_dragging:
             
             # Check if we've moved far enough to start dragging
             move_distance = (event.pos() - self._drag_start_pos).manhattanLength()
@@ -169,15 +212,16 @@ class DiagramView(QGraphicsView):
                 self._is_actually_dragging = True
         
         # Check if we're actually dragging an item
-        if (hasattr(self, '_potential_drag_item') and self._potential_drag_item and 
-            self._is_actually_dragging):
+        if self._potential_drag_item is not None and self._is_actually_dragging:
             # Calculate the movement delta
-            current_scene_pos = self.mapToScene(event.pos())
-            scene_delta = current_scene_pos - self._drag_start_scene_pos
+            view_delta = event.position() - self._drag_start_view_pos
+            inv_scale_x, inv_scale_y = self._drag_inv_scale
             
             # Move the item by the delta
-            new_pos = self._drag_start_item_pos + scene_delta
-            self._potential_drag_item.setPos(new_pos)
+            self._potential_drag_item.setPos(
+                self._drag_start_item_pos.x() + view_delta.x() * inv_scale_x,
+                self._drag_start_item_pos.y() + view_delta.y() * inv_scale_y
+            )
             return
         
         super().mouseMoveEvent(event)
@@ -188,8 +232,7 @@ class DiagramView(QGraphicsView):
         self._press_hold_timer.stop()
         
         # Check if we were dragging the canvas
-        if (hasattr(self, '_is_canvas_dragging') and self._is_canvas_dragging and 
-            event.button() == Qt.MouseButton.LeftButton):
+        if self._is_canvas_dragging and event.button() == Qt.MouseButton.LeftButton:
             # Reset canvas drag state
             self._canvas_drag_start = None
             self._is_canvas_dragging = False
@@ -198,8 +241,7 @@ class DiagramView(QGraphicsView):
             return
         
         # Check if we were dragging an item
-        if (hasattr(self, '_potential_drag_item') and self._potential_drag_item and 
-            event.button() == Qt.MouseButton.LeftButton):
+        if self._potential_drag_item is not None and event.button() == Qt.MouseButton.LeftButton:
             
             if self._is_actually_dragging:
                 # Create undo command for the move
@@ -207,11 +249,9 @@ class DiagramView(QGraphicsView):
                     end_position = self._potential_drag_item.pos()
                     if self._drag_start_item_pos != end_position:
                         from core.undo_commands import MoveObject
-                        from PyQt6.QtWidgets import QApplication
                         
                         command = MoveObject(self._potential_drag_item, self._drag_start_item_pos, end_position)
-                        app = QApplication.instance()
-                        app.undo_stack.push(command)
+                        undo_stack().push(command)
             
             # Clear dragging state
             self._potential_drag_item = None
@@ -220,18 +260,15 @@ class DiagramView(QGraphicsView):
             return
         
         # Clear canvas drag state if it was just a click
-        if hasattr(self, '_canvas_drag_start'):
-            self._canvas_drag_start = None
-            self._is_canvas_dragging = False
+        self._canvas_drag_start = None
+        self._is_canvas_dragging = False
         
         if event.button() == Qt.MouseButton.MiddleButton:
             # Return to normal drag mode after middle mouse release
             self.setDragMode(QGraphicsView.DragMode.NoDrag)
-            print("Reset drag mode to NoDrag")
         elif event.button() == Qt.MouseButton.LeftButton:
             # Reset to NoDrag after left button release
             self.setDragMode(QGraphicsView.DragMode.NoDrag)
-            print("Reset drag mode to NoDrag")
         
         super().mouseReleaseEvent(event)
     
@@ -240,7 +277,6 @@ class DiagramView(QGraphicsView):
         if not self._press_hold_pos:
             return
         
-        from PyQt6.QtWidgets import QMenu
         menu = QMenu(self)
         
         # Add Object action
@@ -270,11 +306,9 @@ class DiagramView(QGraphicsView):
         
         # Add to scene via undo command
         from core.undo_commands import PlaceObject
-        from PyQt6.QtWidgets import QApplication
         
         command = PlaceObject(scene, new_object, scene_pos)
-        app = QApplication.instance()
-        app.undo_stack.push(command)
+        undo_stack().push(command)
     
     def keyPressEvent(self, event):
         """Handle key press events."""
@@ -286,8 +320,8 @@ class DiagramView(QGraphicsView):
         elif event.key() == Qt.Key.Key_Minus:
             # Zoom out with - key
             if self._current_zoom > self._min_zoom:
-                self.scale(1 / self._zoom_factor, 1 / self._zoom_factor)
-                self._current_zoom /= self._zoom_factor
+                self.scale(self._inv_zoom_factor, self._inv_zoom_factor)
+                self._current_zoom *= self._inv_zoom_factor
         elif event.key() == Qt.Key.Key_0:
             # Reset zoom with 0 key
             self.reset_zoom()
@@ -299,24 +333,14 @@ class DiagramView(QGraphicsView):
         # Suppress overlay for a short time after double-click
         self._suppress_overlay = True
         
-        # Set up timer to clear suppression after 100ms
-        from PyQt6.QtCore import QTimer
-        if self._suppress_overlay_timer:
-            self._suppress_overlay_timer.stop()
-        
-        self._suppress_overlay_timer = QTimer()
-        self._suppress_overlay_timer.timeout.connect(self._clear_overlay_suppression)
-        self._suppress_overlay_timer.setSingleShot(True)
-        self._suppress_overlay_timer.start(100)  # 100ms delay
+        # (Re)start the timer that clears the suppression
+        self._suppress_overlay_timer.start()
         
         super().mouseDoubleClickEvent(event)
     
     def _clear_overlay_suppression(self):
         """Clear the overlay suppression flag."""
         self._suppress_overlay = False
-        if self._suppress_overlay_timer:
-            self._suppress_overlay_timer.stop()
-            self._suppress_overlay_timer = None
     
     def reset_zoom(self):
         """Reset zoom to 100%."""
@@ -333,6 +357,47 @@ class DiagramView(QGraphicsView):
                 transform = self.transform()
                 self._current_zoom = transform.m11()  # Get scale factor
     
+    def set_full_viewport_updates(self, enabled):
+        """Repaint the whole viewport on every change, which is faster for very dense diagrams."""
+        if enabled:
+            self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.FullViewportUpdate)
+        else:
+            self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.BoundingRectViewportUpdate)
+    
+    def set_opengl_viewport(self, enabled):
+        """Render through an OpenGL viewport with 4x MSAA, or the plain raster one.
+        
+        Returns whether OpenGL is in use afterwards, which stays off when PyQt6
+        was built without the QtOpenGLWidgets module.
+        """
+        if enabled:
+            try:
+                from PyQt6.QtOpenGLWidgets import QOpenGLWidget
+            except ImportError:
+                enabled = False
+        if enabled == self._opengl_viewport:
+            return enabled
+        
+        if enabled:
+            viewport = QOpenGLWidget()
+            surface_format = QSurfaceFormat()
+            surface_format.setSamples(4)
+            viewport.setFormat(surface_format)
+            self.setViewport(viewport)
+            # OpenGL viewports repaint whole frames anyway
+            self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.FullViewportUpdate)
+        else:
+            self.setViewport(QWidget())
+            self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.BoundingRectViewportUpdate)
+        
+        # setViewport() stacks the new viewport above the overlay
+        self.proof_step_overlay.raise_()
+        
+        # Multisampling does the smoothing on the OpenGL viewport
+        self.setRenderHint(QPainter.RenderHint.Antialiasing, not enabled)
+        self._opengl_viewport = enabled
+        return enabled
+    
     def get_zoom_level(self):
         """Get the current zoom level."""
         return self._current_zoom
@@ -361,10 +426,15 @@ class DiagramView(QGraphicsView):
                 self.proof_step_overlay.hide()
         else:
             # Re-trigger selection changed to show overlay if appropriate
+            self._last_selection_fp = None
             self.on_selection_changed()
     
     def on_selection_changed(self):
-        """Handle selection changes in the scene."""
+        """Handle selection changes in the scene, coalescing bursts into one update."""
+        self._selection_timer.start()
+    
+    def _do_selection_update(self):
+        """Update the proof step overlay for the current selection."""
         # Don't show overlay if we just had a double-click
         if hasattr(self, '_suppress_overlay') and self._suppress_overlay:
             return
@@ -383,22 +453,67 @@ class DiagramView(QGraphicsView):
         selected_items = scene.selectedItems()
         
         # Separate objects and arrows
-        selected_objects = []
-        selected_arrows = []
+        selected_objects = [item for item in selected_items if isinstance(item, Object)]
+        selected_arrows = [item for item in selected_items if isinstance(item, Arrow)]
         
-        for item in selected_items:
-            # Check if it's an object (has get_text and is not an arrow)
-            if hasattr(item, 'get_text'):
-                if hasattr(item, 'get_source'):  # It's an arrow
-                    selected_arrows.append(item)
-                else:  # It's an object
-                    selected_objects.append(item)
+        # Nothing to show and nothing shown, so there is nothing to update
+        overlay_visible = self.proof_step_overlay.isVisible()
+        if not selected_objects and not selected_arrows and not overlay_visible:
+            return
+        
+        # A burst of changes can settle back on the selection the overlay
+        # already shows; the visibility check catches overlays hidden since
+        fingerprint = (tuple(map(id, selected_objects)), tuple(map(id, selected_arrows)), overlay_visible)
+        if fingerprint == self._last_selection_fp:
+            return
         
         # Update overlay
         self.proof_step_overlay.update_for_selection(selected_objects, selected_arrows)
+        self._last_selection_fp = fingerprint[:2] + (self.proof_step_overlay.isVisible(),)
     
     def setScene(self, scene):
         """Override setScene to connect selection signals."""
         super().setScene(scene)
+        self._thumbnail_cache = None
         if scene:
             scene.selectionChanged.connect(self.on_selection_changed)
+            scene.changed.connect(self._invalidate_thumbnail)
+            self.set_scene_index_method()
+    
+    def get_scene_thumbnail(self, size):
+        """Return an image of the whole diagram scaled into size (a QSize).
+        
+        The image is cached until the scene next changes, so overview or
+        preview widgets can redraw from it without repainting every item.
+        """
+        if self._thumbnail_cache is not None and self._thumbnail_cache[0] == size:
+            return self._thumbnail_cache[1]
+        
+        image = QImage(size, QImage.Format.Format_ARGB32_Premultiplied)
+        image.fill(Qt.GlobalColor.transparent)
+        scene = self.scene()
+        if scene is not None:
+            painter = QPainter(image)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            scene.render(painter, QRectF(image.rect()), scene.itemsBoundingRect(),
+                         Qt.AspectRatioMode.KeepAspectRatio)
+            painter.end()
+        self._thumbnail_cache = (size, image)
+        return image
+    
+    def _invalidate_thumbnail(self):
+        """Drop the cached scene thumbnail."""
+        self._thumbnail_cache = None
+    
+    def set_scene_index_method(self, method=None):
+        """Set the scene's item index method, or pick one from its item count if None."""
+        scene = self.scene()
+        if scene is None:
+            return
+        if method is None:
+            if len(scene.items()) > self._NO_INDEX_ITEM_COUNT:
+                method = QGraphicsScene.ItemIndexMethod.NoIndex
+            else:
+                method = QGraphicsScene.ItemIndexMethod.BspTreeIndex
+        if scene.itemIndexMethod() != method:
+            scene.setItemIndexMethod(method)
@@ -2,16 +2,113 @@
 Main window for the DAG diagram application.
 """
 import os
+import functools
+import traceback
+from datetime import datetime
 from PyQt6.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout, 
                              QWidget, QToolBar, QPushButton, QLabel,
                              QStatusBar, QMenuBar, QMenu, QMessageBox, QTabWidget,
                              QFileDialog, QApplication)
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QAction, QKeySequence, QColor
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QAction, QKeySequence, QBrush
 
 from .diagram_scene import DiagramScene
 from .diagram_view import DiagramView
-from core.session_manager import SessionManager
+from .object_node import Object
+from .arrow import Arrow
+from .additional_label import AdditionalLabel
+from core.app import undo_stack
+from core.undo_commands import DeleteItems
+from dialog.diagram_settings_dialog import DiagramSettings, DiagramSettingsDialog
+from core.session_manager import SessionManager, dumps_json
+
+
+# Math-calligraphy Unicode letters 𝒜 to 𝒵, used to name diagrams
+_MATH_CAL_LETTERS = (
+    '𝒜', 'ℬ', '𝒞', '𝒟', 'ℰ', 'ℱ', '𝒢', 'ℋ', 'ℐ', '𝒥', '𝒦', 'ℒ', 'ℳ',
+    '𝒩', '𝒪', '𝒫', '𝒬', 'ℛ', '𝒮', '𝒯', '𝒰', '𝒱', '𝒲', '𝒳', '𝒴', '𝒵',
+)
+
+
+# Menu bar contents as (menu title, entries). An entry is None for a
+# separator, (label, shortcut, slot name) for a plain action, or the name of
+# a MainWindow method that adds its own actions to the menu
+_MENU_SPEC = (
+    ("📁 &File", (
+        ("📄 &New", QKeySequence.StandardKey.New, 'new_diagram'),
+        None,
+        ("📂 &Open...", QKeySequence.StandardKey.Open, 'open_file'),
+        ("💾 &Save", QKeySequence.StandardKey.Save, 'save_file'),
+        ("💾 Save &As...", QKeySequence.StandardKey.SaveAs, 'save_file_as'),
+        ("📝 Export &Readable...", None, 'export_readable_file'),
+        None,
+        ("🚪 E&xit", QKeySequence.StandardKey.Quit, 'close'),
+    )),
+    ("✏️ &Edit", (
+        '_add_undo_redo_actions',
+        None,
+        ("🗑️ &Delete", QKeySequence.StandardKey.Delete, 'delete_selected_items'),
+    )),
+    ("📊 &Diagram", (
+        ("➕ &New Diagram", "Ctrl+Shift+N", 'create_new_diagram'),
+        None,
+        '_add_settings_action',
+    )),
+    ("👁️ &View", (
+        ("🔍+ Zoom &In", QKeySequence.StandardKey.ZoomIn, 'zoom_in'),
+        ("🔍- Zoom &Out", QKeySequence.StandardKey.ZoomOut, 'zoom_out'),
+        ("🎯 &Reset Zoom", "Ctrl+0", 'reset_zoom'),
+        None,
+        ("📐 &Fit All", "Ctrl+F", 'fit_in_view_all'),
+        None,
+        '_add_opengl_action',
+    )),
+    ("🔍 &Proof", (
+        '_add_proof_buttons_action',
+    )),
+    ("❓ &Help", (
+        ("ℹ️ &About", None, 'show_about'),
+    )),
+)
+
+# Menus without keyboard shortcuts, whose actions are only created when
+# they are first opened (menus with shortcuts need their actions up front)
+_LAZY_MENUS = frozenset(("🔍 &Proof", "❓ &Help"))
+
+# Toolbar buttons as (label, slot name), with None for a separator
+_TOOLBAR_SPEC = (
+    ("📄 New", 'create_new_diagram'),
+    None,
+    ("🔍+ Zoom In", 'zoom_in'),
+    ("🔍- Zoom Out", 'zoom_out'),
+    ("🎯 Reset Zoom", 'reset_zoom'),
+    None,
+    ("📐 Fit All", 'fit_in_view_all'),
+)
+
+# Application name shown in the title bar
+_WINDOW_TITLE = "Pythom - DAG Diagram Editor"
+
+# Text of the Help > About box
+_ABOUT_TEXT = (
+    f"{_WINDOW_TITLE}\n\n"
+    "A PyQt6-based application for creating and editing\n"
+    "Directed Acyclic Graph (DAG) diagrams.\n\n"
+    "• Double-click on the canvas to add objects\n"
+    "• Double-click on objects to start creating arrows\n"
+    "• Double-click same object twice to create self-loop\n"
+    "• While creating arrows, double-click empty space to create new target object\n"
+    "• Parallel arrows automatically curve to avoid overlap\n"
+    "• Objects cannot occupy the same grid position\n"
+    "• Select items and press DEL to delete them\n"
+    "• Right-click on objects/arrows to edit their names\n"
+    "• Right-click on empty space to add text labels\n"
+    "• Objects snap to a 100x100 grid\n"
+    "• Node names: A, B, C, ..., Z, A', B', etc.\n"
+    "• Arrow names: a, b, c, ..., z, a', b', etc.\n"
+    "• Full undo/redo support with Ctrl+Z/Ctrl+Y\n"
+    "• Press ESC or right-click to cancel arrow creation"
+)
 
 
 class MainWindow(QMainWindow):
@@ -20,7 +117,10 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         
-        self.setWindowTitle("Pythom - DAG Diagram Editor")
+        # The application object lives as long as the window does
+        self._app = QApplication.instance()
+        
+        self.setWindowTitle(_WINDOW_TITLE)
         self.setGeometry(100, 100, 1200, 800)
         
         # Create tab widget as central widget
@@ -29,6 +129,11 @@ class MainWindow(QMainWindow):
         self.tab_widget.tabCloseRequested.connect(self.close_tab)
         self.setCentralWidget(self.tab_widget)
         
+        # Active view and scene, refreshed whenever the current tab changes
+        self._current_view = None
+        self._current_scene = None
+        self.tab_widget.currentChanged.connect(self._on_current_tab_changed)
+        
         # Keep track of diagram counter for naming
         self.diagram_counter = 0
         
@@ -36,45 +141,34 @@ class MainWindow(QMainWindow):
         self.current_file = None
         self.is_modified = False
         
+        # Title without the modified marker, rebuilt only when current_file changes
+        self._title_file = None
+        self._file_title = _WINDOW_TITLE
+        
         # Initialize session manager
         self.session_manager = SessionManager()
         
-        # Track geometry changes for saving
-        self._geometry_timer = None
+        # Track geometry changes for saving, once they settle for a second
+        self._geometry_timer = QTimer(self)
+        self._geometry_timer.setSingleShot(True)
+        self._geometry_timer.setInterval(1000)
+        self._geometry_timer.timeout.connect(self._save_geometry)
+        
+        # Scenes emit changed for every repaint while dragging; the document
+        # is marked modified once they have been quiet for 200ms
+        self._modified_timer = QTimer(self)
+        self._modified_timer.setSingleShot(True)
+        self._modified_timer.setInterval(200)
+        self._modified_timer.timeout.connect(self.mark_modified)
+        
+        # One background brush per color, shared by every diagram that uses it
+        self._brush_cache = {}  # rgba -> QBrush
+        
+        # Help > About box, created the first time it is shown
+        self._about_box = None
         
         # Initialize diagram settings with defaults
-        self.diagram_settings = {
-            # Appearance
-            'bg_color': QColor(255, 255, 255),
-            'selection_color': QColor(255, 165, 0),
-            'font_size': 14,
-            'text_color': QColor(0, 0, 0),
-            
-            # Grid
-            'grid_spacing': 150,
-            'show_grid': False,
-            'grid_color': QColor(200, 200, 200),
-            'grid_width': 1.0,
-            'snap_to_grid': True,
-            'auto_grid_spacing': True,
-            
-            # Objects
-            'obj_border_color': QColor(0, 0, 0),
-            'obj_fill_color': QColor(0, 0, 0, 0),
-            'obj_border_width': 0.0,
-            'corner_radius': 10,
-            'min_width': 80,
-            'min_height': 80,
-            'obj_padding': 10,
-            
-            # Arrows
-            'arrow_color': QColor(100, 100, 100),
-            'arrow_width': 2.0,
-            'arrow_head_size': 15,
-            'arrow_head_angle': 30,
-            'curve_intensity': 30,
-            'self_loop_radius': 50,
-        }
+        self.diagram_settings = DiagramSettings()
         
         # Create the first diagram tab
         self.create_new_diagram()
@@ -83,31 +177,13 @@ class MainWindow(QMainWindow):
         self.create_menus()
         self.create_toolbar()
         self.create_status_bar()
-        
-        # Connect signals
-        if self.get_current_scene():
-            self.get_current_scene().object_added.connect(self.on_object_added)
     
-    def get_math_calligraphy_name(self, index):
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def get_math_calligraphy_name(index):
         """Get math-calligraphy Unicode letter for diagram naming."""
-        # Math-calligraphy Unicode letters (𝒜, ℬ, 𝒞, 𝒟, ...)
-        math_cal_base = {
-            'A': '𝒜', 'B': 'ℬ', 'C': '𝒞', 'D': '𝒟', 'E': 'ℰ', 'F': 'ℱ', 'G': '𝒢', 'H': 'ℋ',
-            'I': 'ℐ', 'J': '𝒥', 'K': '𝒦', 'L': 'ℒ', 'M': 'ℳ', 'N': '𝒩', 'O': '𝒪', 'P': '𝒫',
-            'Q': '𝒬', 'R': 'ℛ', 'S': '𝒮', 'T': '𝒯', 'U': '𝒰', 'V': '𝒱', 'W': '𝒲', 'X': '𝒳',
-            'Y': '𝒴', 'Z': '𝒵'
-        }
-        
-        # Calculate apostrophe count and letter index
-        apostrophe_count = index // 26
-        letter_index = index % 26
-        letter = chr(ord('A') + letter_index)
-        
-        # Get math-calligraphy letter and add apostrophes
-        math_cal_letter = math_cal_base[letter]
-        apostrophes = "'" * apostrophe_count
-        
-        return math_cal_letter + apostrophes
+        # Letters cycle A-Z, with one more apostrophe on each pass
+        return _MATH_CAL_LETTERS[index % 26] + "'" * (index // 26)
     
     def create_new_diagram(self):
         """Create a new diagram in a new tab."""
@@ -126,9 +202,12 @@ class MainWindow(QMainWindow):
         tab_index = self.tab_widget.addTab(view, diagram_name)
         self.tab_widget.setCurrentIndex(tab_index)
         
-        # Connect scene signals for modification tracking
-        scene.object_added.connect(self.on_object_added)
-        scene.changed.connect(self.mark_modified)  # Mark as modified on any scene change
+        # Connect scene signals for modification tracking, keeping the
+        # connections so close_tab can drop exactly these
+        scene._window_connections = (
+            scene.object_added.connect(self.on_object_added),
+            scene.changed.connect(self._on_scene_changed),  # Mark as modified on any scene change
+        )
         
         return scene, view
     
@@ -147,16 +226,11 @@ class MainWindow(QMainWindow):
                 # Clear all items from the scene
                 scene.clear()
                 
-                # Disconnect modification tracking signals
-                try:
-                    scene.object_added.disconnect(self.on_object_added)
-                except TypeError:
-                    pass  # No connections to disconnect
-                
-                try:
-                    scene.changed.disconnect(self.mark_modified)
-                except TypeError:
-                    pass  # No connections to disconnect
+                # Disconnect modification tracking signals (restored
+                # diagrams never had them connected)
+                for connection in getattr(scene, '_window_connections', ()):
+                    scene.disconnect(connection)
+                scene._window_connections = ()
                 
                 # If the scene has any timers, stop them
                 if hasattr(scene, '_validation_timer'):
@@ -180,171 +254,125 @@ class MainWindow(QMainWindow):
     
     def get_current_scene(self):
         """Get the currently active scene."""
-        current_view = self.tab_widget.currentWidget()
-        return current_view.scene() if current_view else None
+        return self._current_scene
     
     def get_current_view(self):
         """Get the currently active view."""
-        return self.tab_widget.currentWidget()
+        return self._current_view
+    
+    def _remove_all_tabs(self):
+        """Remove every tab, announcing the tab change once instead of per tab."""
+        self.tab_widget.blockSignals(True)
+        try:
+            while self.tab_widget.count() > 0:
+                self.tab_widget.removeTab(0)
+        finally:
+            self.tab_widget.blockSignals(False)
+        self.tab_widget.currentChanged.emit(-1)
+    
+    def _on_current_tab_changed(self, index):
+        """Remember the view and scene of the newly current tab."""
+        widget = self.tab_widget.widget(index)
+        self._current_view = widget
+        self._current_scene = widget.scene() if widget else None
         
     def create_menus(self):
-        """Create the menu bar."""
-        menubar = self.menuBar()
-        
-        # File menu
-        file_menu = menubar.addMenu("📁 &File")
-        
-        new_action = QAction("📄 &New", self)
-        new_action.setShortcut(QKeySequence.StandardKey.New)
-        new_action.triggered.connect(self.new_diagram)
-        file_menu.addAction(new_action)
-        
-        file_menu.addSeparator()
-        
-        open_action = QAction("📂 &Open...", self)
-        open_action.setShortcut(QKeySequence.StandardKey.Open)
-        open_action.triggered.connect(self.open_file)
-        file_menu.addAction(open_action)
-        
-        save_action = QAction("💾 &Save", self)
-        save_action.setShortcut(QKeySequence.StandardKey.Save)
-        save_action.triggered.connect(self.save_file)
-        file_menu.addAction(save_action)
-        
-        save_as_action = QAction("💾 Save &As...", self)
-        save_as_action.setShortcut(QKeySequence.StandardKey.SaveAs)
-        save_as_action.triggered.connect(self.save_file_as)
-        file_menu.addAction(save_as_action)
-        
-        file_menu.addSeparator()
-        
-        exit_action = QAction("🚪 E&xit", self)
-        exit_action.setShortcut(QKeySequence.StandardKey.Quit)
-        exit_action.triggered.connect(self.close)
-        file_menu.addAction(exit_action)
-        
-        # Edit menu
-        edit_menu = menubar.addMenu("✏️ &Edit")
-        
-        # Get the global undo stack
-        from PyQt6.QtWidgets import QApplication
-        app = QApplication.instance()
-        undo_stack = app.undo_stack
-        
+        """Create the menu bar from _MENU_SPEC."""
+        add_menu = self.menuBar().addMenu
+        for title, entries in _MENU_SPEC:
+            menu = add_menu(title)
+            if title in _LAZY_MENUS:
+                self._on_first_show(menu, lambda menu, entries=entries: self._populate_menu(menu, entries))
+            else:
+                self._populate_menu(menu, entries)
+    
+    def _populate_menu(self, menu, entries):
+        """Add the actions described by entries (see _MENU_SPEC) to menu."""
+        for entry in entries:
+            if entry is None:
+                menu.addSeparator()
+            elif isinstance(entry, str):
+                # Entries that need more than a shortcut and a slot
+                getattr(self, entry)(menu)
+            else:
+                label, shortcut, slot_name = entry
+                action = QAction(label, self)
+                if shortcut is not None:
+                    action.setShortcut(shortcut)
+                action.triggered.connect(getattr(self, slot_name))
+                menu.addAction(action)
+    
+    def _on_first_show(self, menu, callback):
+        """Call callback(menu) just before menu is shown for the first time."""
+        def first_show():
+            menu.aboutToShow.disconnect(connection)
+            callback(menu)
+        connection = menu.aboutToShow.connect(first_show)
+    
+    def _add_undo_redo_actions(self, menu):
+        """Add the global undo stack's undo and redo actions to menu."""
         # Add undo action
-        undo_action = undo_stack.createUndoAction(self, "↶ &Undo")
+        undo_action = undo_stack().createUndoAction(self, "↶ &Undo")
         undo_action.setShortcut(QKeySequence.StandardKey.Undo)
-        edit_menu.addAction(undo_action)
+        menu.addAction(undo_action)
         
         # Add redo action
-        redo_action = undo_stack.createRedoAction(self, "↷ &Redo")
+        redo_action = undo_stack().createRedoAction(self, "↷ &Redo")
         redo_action.setShortcut(QKeySequence.StandardKey.Redo)
-        edit_menu.addAction(redo_action)
-        
-        # Add separator
-        edit_menu.addSeparator()
-        
-        # Add delete action
-        delete_action = QAction("🗑️ &Delete", self)
-        delete_action.setShortcut(QKeySequence.StandardKey.Delete)
-        delete_action.triggered.connect(self.delete_selected_items)
-        edit_menu.addAction(delete_action)
-        
-        # Diagram menu
-        diagram_menu = menubar.addMenu("📊 &Diagram")
-        
-        new_diagram_action = QAction("➕ &New Diagram", self)
-        new_diagram_action.setShortcut("Ctrl+Shift+N")
-        new_diagram_action.triggered.connect(self.create_new_diagram)
-        diagram_menu.addAction(new_diagram_action)
-        
-        diagram_menu.addSeparator()
-        
+        menu.addAction(redo_action)
+    
+    def _add_settings_action(self, menu):
+        """Add the diagram settings action to menu."""
         settings_action = QAction("⚙️ &Settings...", self)
         settings_action.setShortcut("Ctrl+,")
+        settings_action.triggered.connect(self.show_diagram_settings)
+        menu.addAction(settings_action)
+        
+        # Looking up the style icon can read icon theme files, so it waits
+        # until the menu is first opened
+        self._on_first_show(menu, lambda menu: self._set_settings_icon(settings_action))
+    
+    def _set_settings_icon(self, settings_action):
+        """Give the settings action a gear-like icon, if the style has one."""
         # Add gear icon if available
         try:
             # Try to use a more appropriate settings-related icon
             settings_action.setIcon(self.style().standardIcon(self.style().StandardPixmap.SP_ComputerIcon))
         except:
             pass  # If icon not available, just use text
-        settings_action.triggered.connect(self.show_diagram_settings)
-        diagram_menu.addAction(settings_action)
-        
-        # View menu
-        view_menu = menubar.addMenu("👁️ &View")
-        
-        zoom_in_action = QAction("🔍+ Zoom &In", self)
-        zoom_in_action.setShortcut(QKeySequence.StandardKey.ZoomIn)
-        zoom_in_action.triggered.connect(self.zoom_in)
-        view_menu.addAction(zoom_in_action)
-        
-        zoom_out_action = QAction("🔍- Zoom &Out", self)
-        zoom_out_action.setShortcut(QKeySequence.StandardKey.ZoomOut)
-        zoom_out_action.triggered.connect(self.zoom_out)
-        view_menu.addAction(zoom_out_action)
-        
-        reset_zoom_action = QAction("🎯 &Reset Zoom", self)
-        reset_zoom_action.setShortcut("Ctrl+0")
-        reset_zoom_action.triggered.connect(self.reset_zoom)
-        view_menu.addAction(reset_zoom_action)
-        
-        view_menu.addSeparator()
-        
-        fit_all_action = QAction("📐 &Fit All", self)
-        fit_all_action.setShortcut("Ctrl+F")
-        fit_all_action.triggered.connect(self.fit_in_view_all)
-        view_menu.addAction(fit_all_action)
-        
-        # Proof menu
-        proof_menu = menubar.addMenu("🔍 &Proof")
-        
+    
+    def _add_opengl_action(self, menu):
+        """Add the OpenGL rendering toggle to menu."""
+        # OpenGL rendering is opt-in since it depends on the graphics driver
+        self.opengl_action = QAction("🖥️ &OpenGL Rendering", self)
+        self.opengl_action.setCheckable(True)
+        self.opengl_action.setChecked(self.session_manager.get_opengl_viewport())
+        self.opengl_action.triggered.connect(self.toggle_opengl_viewport)
+        menu.addAction(self.opengl_action)
+    
+    def _add_proof_buttons_action(self, menu):
+        """Add the proof step buttons toggle to menu."""
         # Toggle for proof step buttons - default unchecked
         self.proof_buttons_action = QAction("🔘 Proof Step &Buttons", self)
         self.proof_buttons_action.setCheckable(True)
         self.proof_buttons_action.setChecked(False)  # Default unchecked
         self.proof_buttons_action.triggered.connect(self.toggle_proof_buttons)
-        proof_menu.addAction(self.proof_buttons_action)
-        
-        # Help menu
-        help_menu = menubar.addMenu("❓ &Help")
-        
-        about_action = QAction("ℹ️ &About", self)
-        about_action.triggered.connect(self.show_about)
-        help_menu.addAction(about_action)
+        menu.addAction(self.proof_buttons_action)
         
     def create_toolbar(self):
-        """Create the toolbar."""
+        """Create the toolbar from _TOOLBAR_SPEC."""
         toolbar = QToolBar("🔧 Main Toolbar", self)
         toolbar.setObjectName("MainToolbar")  # Set object name to avoid warning
         self.addToolBar(toolbar)
         
-        # New diagram button
-        new_btn = QPushButton("📄 New", self)
-        new_btn.clicked.connect(self.create_new_diagram)
-        toolbar.addWidget(new_btn)
-        
-        toolbar.addSeparator()
-        
-        # Zoom buttons
-        zoom_in_btn = QPushButton("🔍+ Zoom In", self)
-        zoom_in_btn.clicked.connect(self.zoom_in)
-        toolbar.addWidget(zoom_in_btn)
-        
-        zoom_out_btn = QPushButton("🔍- Zoom Out", self)
-        zoom_out_btn.clicked.connect(self.zoom_out)
-        toolbar.addWidget(zoom_out_btn)
-        
-        reset_zoom_btn = QPushButton("🎯 Reset Zoom", self)
-        reset_zoom_btn.clicked.connect(self.reset_zoom)
-        toolbar.addWidget(reset_zoom_btn)
-        
-        toolbar.addSeparator()
-        
-        # Fit all button
-        fit_all_btn = QPushButton("📐 Fit All", self)
-        fit_all_btn.clicked.connect(self.fit_in_view_all)
-        toolbar.addWidget(fit_all_btn)
+        for entry in _TOOLBAR_SPEC:
+            if entry is None:
+                toolbar.addSeparator()
+                continue
+            label, slot_name = entry
+            button = QPushButton(label, self)
+            button.clicked.connect(getattr(self, slot_name))
+            toolbar.addWidget(button)
         
     def create_status_bar(self):
         """Create the status bar."""
@@ -401,17 +429,25 @@ class MainWindow(QMainWindow):
         """Toggle the proof step buttons overlay on/off."""
         is_enabled = self.proof_buttons_action.isChecked()
         
-        # Apply to current view
-        current_view = self.get_current_view()
-        if current_view:
-            current_view.set_proof_buttons_enabled(is_enabled)
-        
-        # Apply to all views
+        # Apply to all views; each tab widget is the DiagramView itself
         for i in range(self.tab_widget.count()):
             widget = self.tab_widget.widget(i)
-            if hasattr(widget, 'view'):
-                widget.view.set_proof_buttons_enabled(is_enabled)
+            if isinstance(widget, DiagramView):
+                widget.set_proof_buttons_enabled(is_enabled)
             
+    def toggle_opengl_viewport(self):
+        """Switch all diagram views between OpenGL and raster rendering."""
+        is_enabled = self.opengl_action.isChecked()
+        
+        for i in range(self.tab_widget.count()):
+            widget = self.tab_widget.widget(i)
+            if isinstance(widget, DiagramView):
+                is_enabled = widget.set_opengl_viewport(is_enabled)
+        
+        # Reflect (and remember) whether OpenGL is actually available
+        self.opengl_action.setChecked(is_enabled)
+        self.session_manager.set_opengl_viewport(is_enabled)
+    
     def update_zoom_label(self):
         """Update the zoom level display in status bar."""
         current_view = self.get_current_view()
@@ -423,20 +459,21 @@ class MainWindow(QMainWindow):
         """Handle when an object is added to the scene."""
         current_scene = self.get_current_scene()
         if current_scene:
-            object_count = len([item for item in current_scene.items() 
-                               if hasattr(item, 'get_text')])
+            # Counts every named item (objects and arrows), as before
+            object_count = len(current_scene._objects) + len(current_scene._arrows)
             self.status_bar.showMessage(f"📦 Object added. Total objects: {object_count}")
     
     def show_diagram_settings(self):
         """Show the diagram settings dialog."""
-        from dialog.diagram_settings_dialog import DiagramSettingsDialog
-        
         dialog = DiagramSettingsDialog(self)
         dialog.set_settings(self.diagram_settings)
         
         if dialog.exec() == dialog.DialogCode.Accepted:
-            # Update settings
+            # Update settings; brushes for a replaced background are not needed again
+            old_bg_color = self.diagram_settings.bg_color
             self.diagram_settings = dialog.get_settings()
+            if self.diagram_settings.bg_color != old_bg_color:
+                self._brush_cache.clear()
             
             # Apply settings to current scene/view
             self.apply_settings_to_current_diagram()
@@ -454,7 +491,7 @@ class MainWindow(QMainWindow):
         
         # Handle grid spacing changes with position scaling
         old_grid_spacing = getattr(current_scene, '_grid_size', 150)
-        new_grid_spacing = self.diagram_settings['grid_spacing']
+        new_grid_spacing = self.diagram_settings.grid_spacing
         
         if old_grid_spacing != new_grid_spacing:
             # Calculate scale factor and apply scaling
@@ -466,31 +503,42 @@ class MainWindow(QMainWindow):
         if hasattr(current_scene, '_grid_size'):
             current_scene._grid_size = new_grid_spacing
         if hasattr(current_scene, '_grid_enabled'):
-            current_scene._grid_enabled = self.diagram_settings['show_grid']
+            current_scene._grid_enabled = self.diagram_settings.show_grid
         
         # Apply background color
-        current_scene.setBackgroundBrush(self.diagram_settings['bg_color'])
+        current_scene.setBackgroundBrush(self._brush_for(self.diagram_settings.bg_color))
         
-        # Update the scene to reflect changes
+        # Update the scene to reflect changes; this also repaints every
+        # viewport showing it, so the view needs no update of its own
         current_scene.update()
-        current_view.update()
         
         # TODO: Apply other settings to existing objects and arrows
         # This would require iterating through scene items and updating their properties
         
+    def _brush_for(self, color):
+        """Return the shared QBrush for color, creating it on first use."""
+        rgba = color.rgba()
+        brush = self._brush_cache.get(rgba)
+        if brush is None:
+            brush = self._brush_cache[rgba] = QBrush(color)
+        return brush
+    
     def apply_settings_to_new_diagram(self, scene, view):
         """Apply current settings to a newly created diagram."""
         if hasattr(scene, '_grid_size'):
-            scene._grid_size = self.diagram_settings['grid_spacing']
+            scene._grid_size = self.diagram_settings.grid_spacing
         if hasattr(scene, '_grid_enabled'):
-            scene._grid_enabled = self.diagram_settings['show_grid']
+            scene._grid_enabled = self.diagram_settings.show_grid
         
         # Apply background color
-        scene.setBackgroundBrush(self.diagram_settings['bg_color'])
+        scene.setBackgroundBrush(self._brush_for(self.diagram_settings.bg_color))
+        
+        # Apply the rendering backend
+        view.set_opengl_viewport(self.session_manager.get_opengl_viewport())
         
     def check_and_adjust_grid_spacing(self, modified_node=None):
         """Check arrow lengths and adjust grid spacing if auto-spacing is enabled."""
-        if not self.diagram_settings.get('auto_grid_spacing', False):
+        if not self.diagram_settings.auto_grid_spacing:
             return  # Auto-spacing is disabled
         
         current_scene = self.get_current_scene()
@@ -508,7 +556,7 @@ class MainWindow(QMainWindow):
         
         # Calculate arrow lengths
         arrow_lengths = [arrow.get_length() for arrow in arrows]
-        current_grid_spacing = self.diagram_settings['grid_spacing']
+        current_grid_spacing = self.diagram_settings.grid_spacing
         
         # Check if any arrow is 50 or less - double the grid spacing
         min_length = min(arrow_lengths)
@@ -534,11 +582,11 @@ class MainWindow(QMainWindow):
             return
             
         # Get the current grid spacing for scaling calculation
-        old_spacing = self.diagram_settings['grid_spacing']
+        old_spacing = self.diagram_settings.grid_spacing
         scale_factor = new_spacing / old_spacing if old_spacing > 0 else 1.0
         
         # Update the setting
-        self.diagram_settings['grid_spacing'] = new_spacing
+        self.diagram_settings.grid_spacing = new_spacing
         
         # Scale all object and arrow positions if there's a significant change
         if abs(scale_factor - 1.0) > 0.01:  # Only scale if change is significant
@@ -574,24 +622,11 @@ class MainWindow(QMainWindow):
         
     def show_about(self):
         """Show about dialog."""
-        QMessageBox.about(self, "About Pythom", 
-                         "Pythom - DAG Diagram Editor\n\n"
-                         "A PyQt6-based application for creating and editing\n"
-                         "Directed Acyclic Graph (DAG) diagrams.\n\n"
-                         "• Double-click on the canvas to add objects\n"
-                         "• Double-click on objects to start creating arrows\n"
-                         "• Double-click same object twice to create self-loop\n"
-                         "• While creating arrows, double-click empty space to create new target object\n"
-                         "• Parallel arrows automatically curve to avoid overlap\n"
-                         "• Objects cannot occupy the same grid position\n"
-                         "• Select items and press DEL to delete them\n"
-                         "• Right-click on objects/arrows to edit their names\n"
-                         "• Right-click on empty space to add text labels\n"
-                         "• Objects snap to a 100x100 grid\n"
-                         "• Node names: A, B, C, ..., Z, A', B', etc.\n"
-                         "• Arrow names: a, b, c, ..., z, a', b', etc.\n"
-                         "• Full undo/redo support with Ctrl+Z/Ctrl+Y\n"
-                         "• Press ESC or right-click to cancel arrow creation")
+        # The box is built on first use and shown again from then on
+        if self._about_box is None:
+            self._about_box = QMessageBox(QMessageBox.Icon.Information, "About Pythom", _ABOUT_TEXT,
+                                          QMessageBox.StandardButton.Ok, self)
+        self._about_box.exec()
     
     def delete_selected_items(self):
         """Delete the currently selected items from the scene."""
@@ -605,34 +640,23 @@ class MainWindow(QMainWindow):
         if not selected_items:
             return  # Nothing to delete
         
-        # Filter out items that shouldn't be deleted (like temporary items)
-        deletable_items = []
-        for item in selected_items:
-            # Include Objects, Arrows, and AdditionalLabels
-            if (hasattr(item, 'get_text') or  # Objects and Arrows
-                hasattr(item, 'toPlainText')):  # AdditionalLabels
-                deletable_items.append(item)
+        # Only Objects, Arrows and AdditionalLabels can be deleted
+        deletable_items = [item for item in selected_items
+                           if isinstance(item, (Object, Arrow, AdditionalLabel))]
         
         if not deletable_items:
             return  # Nothing deletable selected
         
         # Create and execute delete command
-        from core.undo_commands import DeleteItems
-        from PyQt6.QtWidgets import QApplication
-        
-        command = DeleteItems(current_scene, deletable_items)
-        app = QApplication.instance()
-        app.undo_stack.push(command)
+        undo_stack().push(DeleteItems(current_scene, deletable_items))
         
         # Update status bar
         if len(deletable_items) == 1:
             item = deletable_items[0]
-            if hasattr(item, 'get_text'):
-                item_name = item.get_text()
-                item_type = "Object" if hasattr(item, 'boundingRect') and item.type() == 65537 else "Arrow"
-                self.status_bar.showMessage(f"🗑️ Deleted {item_type} '{item_name}'.")
-            else:
+            if isinstance(item, AdditionalLabel):
                 self.status_bar.showMessage("🗑️ Deleted item.")
+            else:
+                self.status_bar.showMessage(f"🗑️ Deleted {type(item).__name__} '{item.get_text()}'.")
         else:
             self.status_bar.showMessage(f"🗑️ Deleted {len(deletable_items)} items.")
         
@@ -658,7 +682,6 @@ class MainWindow(QMainWindow):
             
         except Exception as e:
             print(f"Error saving session data: {e}")
-            import traceback
             traceback.print_exc()
     
     def restore_session_data(self):
@@ -684,7 +707,6 @@ class MainWindow(QMainWindow):
         
         except Exception as e:
             print(f"Error restoring session data: {e}")
-            import traceback
             traceback.print_exc()
     
     def restore_window_diagrams(self, window_data: dict):
@@ -696,34 +718,46 @@ class MainWindow(QMainWindow):
             processed_diagrams = self.session_manager.process_diagram_list(diagrams_data)
             
             # Clear existing tabs
-            while self.tab_widget.count() > 0:
-                self.tab_widget.removeTab(0)
+            self._remove_all_tabs()
             
             active_tab_index = -1
             
-            # Restore each diagram
-            for i, diagram_info in enumerate(processed_diagrams):
-                diagram_name = diagram_info.get('name', f'Diagram {i+1}')
-                diagram_data = diagram_info.get('data', {})
-                is_active = diagram_info.get('active', False)
-                
-                # Create new diagram tab
-                scene = DiagramScene(self)
-                view = DiagramView(scene, self)
-                
-                # Restore the diagram content
-                if self.session_manager.restore_diagram_scene(scene, diagram_data):
-                    # Add tab
-                    tab_index = self.tab_widget.addTab(view, diagram_name)
+            # Repaint once after all diagrams are added, not once per tab, and
+            # announce only the final current tab
+            self.tab_widget.setUpdatesEnabled(False)
+            self.tab_widget.blockSignals(True)
+            try:
+                # Restore each diagram
+                for i, diagram_info in enumerate(processed_diagrams):
+                    diagram_name = diagram_info.get('name', f'Diagram {i+1}')
+                    diagram_data = diagram_info.get('data', {})
+                    is_active = diagram_info.get('active', False)
                     
-                    if is_active:
-                        active_tab_index = tab_index
-                else:
-                    print(f"Failed to restore diagram: {diagram_name}")
-            
-            # Set active tab
-            if active_tab_index >= 0:
-                self.tab_widget.setCurrentIndex(active_tab_index)
+                    # Create new diagram tab
+                    scene = DiagramScene(self)
+                    view = DiagramView(scene, self)
+                    view.set_opengl_viewport(self.session_manager.get_opengl_viewport())
+                    
+                    # Restore the diagram content
+                    if self.session_manager.restore_diagram_scene(scene, diagram_data):
+                        view.set_scene_index_method()
+                        
+                        # Add tab
+                        tab_index = self.tab_widget.addTab(view, diagram_name)
+                        
+                        if is_active:
+                            active_tab_index = tab_index
+                    else:
+                        print(f"Failed to restore diagram: {diagram_name}")
+                
+                # Set active tab
+                if active_tab_index >= 0:
+                    self.tab_widget.setCurrentIndex(active_tab_index)
+            finally:
+                self.tab_widget.blockSignals(False)
+                self.tab_widget.setUpdatesEnabled(True)
+            if self.tab_widget.count() > 0:
+                self.tab_widget.currentChanged.emit(self.tab_widget.currentIndex())
             
             # If no diagrams were restored, create a default one
             if self.tab_widget.count() == 0:
@@ -731,7 +765,6 @@ class MainWindow(QMainWindow):
         
         except Exception as e:
             print(f"Error restoring window diagrams: {e}")
-            import traceback
             traceback.print_exc()
             
             # Fallback: create a new diagram
@@ -755,20 +788,15 @@ class MainWindow(QMainWindow):
     
     def _schedule_geometry_save(self):
         """Schedule geometry save to avoid too frequent saves."""
-        from PyQt6.QtCore import QTimer
-        
-        if self._geometry_timer is not None:
-            self._geometry_timer.stop()
-        
-        self._geometry_timer = QTimer()
-        self._geometry_timer.setSingleShot(True)
-        self._geometry_timer.timeout.connect(self._save_geometry)
-        self._geometry_timer.start(1000)  # Save after 1 second of inactivity
+        # Restarting pushes the save back to 1 second after the last change
+        self._geometry_timer.start()
     
     def _save_geometry(self):
         """Save window geometry to QSettings."""
         try:
-            self.session_manager.save_window_state(self)
+            # Called repeatedly while the window is moved or resized; the
+            # close path still syncs to disk through save_session_data
+            self.session_manager.save_window_state(self, sync=False)
         except Exception as e:
             print(f"Error saving geometry: {e}")
     
@@ -815,13 +843,11 @@ class MainWindow(QMainWindow):
             return
             
         # Clear all tabs
-        while self.tab_widget.count() > 0:
-            self.tab_widget.removeTab(0)
+        self._remove_all_tabs()
         
         # Clear undo stack
-        app = QApplication.instance()
-        if hasattr(app, 'clear_undo_stack'):
-            app.clear_undo_stack()
+        if hasattr(self._app, 'clear_undo_stack'):
+            self._app.clear_undo_stack()
         
         # Create initial diagram
         self.new_diagram()
@@ -829,6 +855,8 @@ class MainWindow(QMainWindow):
         # Reset file state
         self.current_file = None
         self.is_modified = False
+        # A pending change debounce would mark the clean document modified again
+        self._modified_timer.stop()
         self._update_window_title()
     
     def _load_file(self, file_path: str):
@@ -840,8 +868,7 @@ class MainWindow(QMainWindow):
                 return
             
             # Clear current content
-            while self.tab_widget.count() > 0:
-                self.tab_widget.removeTab(0)
+            self._remove_all_tabs()
             
             # Restore windows/tabs data
             if 'windows' in data:
@@ -850,46 +877,68 @@ class MainWindow(QMainWindow):
             
             # Restore undo stack if available
             if 'undo_stack' in data:
-                app = QApplication.instance()
-                if hasattr(app, 'deserialize_undo_stack'):
-                    app.deserialize_undo_stack(data['undo_stack'])
+                if hasattr(self._app, 'deserialize_undo_stack'):
+                    self._app.deserialize_undo_stack(data['undo_stack'])
             
             self.current_file = file_path
             self.is_modified = False
+            self._modified_timer.stop()
             self._update_window_title()
             
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load file: {e}")
     
+    def export_readable_file(self):
+        """Export the current app data as indented JSON, leaving the current file as is."""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Readable App Data File",
+            "",
+            "JSON Files (*.json);;All Files (*)"
+        )
+        
+        if file_path:
+            if not file_path.endswith('.json'):
+                file_path += '.json'
+            try:
+                encoded = dumps_json(self._collect_session_data(), pretty=True)
+                with open(file_path, 'wb') as f:
+                    f.write(encoded)
+                
+                QMessageBox.information(self, "Success", f"File exported: {file_path}")
+                
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Failed to export file: {e}")
+    
+    def _collect_session_data(self):
+        """Collect the app data written by save and export."""
+        # Collect all window data
+        windows_data = self._collect_windows_data()
+        
+        # Get undo stack data
+        undo_stack_data = None
+        if hasattr(self._app, 'serialize_undo_stack'):
+            undo_stack_data = self._app.serialize_undo_stack()
+        
+        return {
+            "version": "1.0", 
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "windows": windows_data,
+            "undo_stack": undo_stack_data or {}
+        }
+    
     def _save_to_file(self, file_path: str):
         """Save current app data to the specified file."""
         try:
-            # Collect all window data
-            windows_data = self._collect_windows_data()
-            
-            # Get undo stack data
-            app = QApplication.instance()
-            undo_stack_data = None
-            if hasattr(app, 'serialize_undo_stack'):
-                undo_stack_data = app.serialize_undo_stack()
-            
-            # Create session data directly as JSON
-            import json
-            from datetime import datetime
-            
-            session_data = {
-                "version": "1.0", 
-                "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
-                "windows": windows_data,
-                "undo_stack": undo_stack_data or {}
-            }
-            
-            # Save to file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, indent=2, ensure_ascii=False)
+            # Save to file as compact JSON, encoded in one piece before
+            # anything is written; export_readable_file writes it indented
+            encoded = dumps_json(self._collect_session_data())
+            with open(file_path, 'wb') as f:
+                f.write(encoded)
             
             self.current_file = file_path
             self.is_modified = False
+            self._modified_timer.stop()
             self._update_window_title()
             
             QMessageBox.information(self, "Success", f"File saved: {file_path}")
@@ -930,12 +979,14 @@ class MainWindow(QMainWindow):
         # Create new diagram tab
         scene = DiagramScene()
         view = DiagramView(scene)
+        view.set_opengl_viewport(self.session_manager.get_opengl_viewport())
         
         # Restore scene data
         if hasattr(scene, 'deserialize'):
             scene.deserialize(scene_data)
         else:
             self.session_manager.restore_diagram_scene(scene, scene_data)
+        view.set_scene_index_method()
         
         # Add tab
         self.tab_widget.addTab(view, tab_name)
@@ -953,16 +1004,22 @@ class MainWindow(QMainWindow):
     
     def _update_window_title(self):
         """Update the window title to reflect current file."""
-        title = "Pythom - DAG Diagram Editor"
-        if self.current_file:
-            filename = os.path.basename(self.current_file)
-            title = f"{filename} - {title}"
-            if self.is_modified:
-                title = f"* {title}"
-        elif self.is_modified:
-            title = f"* {title}"
-        
-        self.setWindowTitle(title)
+        if self.current_file != self._title_file:
+            self._title_file = self.current_file
+            if self.current_file:
+                self._file_title = f"{os.path.basename(self.current_file)} - {_WINDOW_TITLE}"
+            else:
+                self._file_title = _WINDOW_TITLE
+        
+        if self.is_modified:
+            self.setWindowTitle(f"* {self._file_title}")
+        else:
+            self.setWindowTitle(self._file_title)
+    
+    def _on_scene_changed(self, _regions):
+        """Mark the document as modified once the scene stops changing."""
+        if not self.is_modified:
+            self._modified_timer.start()
     
     def mark_modified(self):
         """Mark the document as modified."""
@@ -1,10 +1,13 @@
 """
 Base Node class for DAG diagram elements.
 """
-from PyQt6.QtWidgets import QGraphicsObject, QGraphicsItem
-from PyQt6.QtCore import QRectF, pyqtSignal
+from PyQt6.QtWidgets import QGraphicsObject, QGraphicsItem, QApplication
+from PyQt6.QtCore import QRectF, QPointF, Qt, pyqtSignal
 from PyQt6.QtGui import QPen, QBrush, QColor
 
+# Nodes snap to the intersections of this grid
+_SNAP_GRID_SIZE = 150
+
 
 class Node(QGraphicsObject):
     """Base class for all diagram nodes."""
@@ -36,49 +39,58 @@ class Node(QGraphicsObject):
         self._start_position = None
         self._is_moving = False
         
+        # Grid intersection this node is indexed under by its scene
+        self._grid_cell = None
+        
+    @staticmethod
+    def grid_cell(pos):
+        """Return the snap grid intersection nearest to pos."""
+        return (round(pos.x() / _SNAP_GRID_SIZE) * _SNAP_GRID_SIZE,
+                round(pos.y() / _SNAP_GRID_SIZE) * _SNAP_GRID_SIZE)
+    
     def boundingRect(self):
         """Return the bounding rectangle of the node."""
         return QRectF(0, 0, self._width, self._height)
     
     def itemChange(self, change, value):
         """Handle item changes, particularly position changes."""
-        from PyQt6.QtCore import QPointF
-        
-    def itemChange(self, change, value):
-        """Handle item changes, particularly position changes."""
-        from PyQt6.QtCore import QPointF
-        
         if change == QGraphicsItem.GraphicsItemChange.ItemPositionChange:
             # Snap to grid intersections (simple grid snapping)
-            new_pos = value
-            grid_size = 150  # Updated to match scene grid size
-            
-            # Find the nearest grid intersection
-            grid_x = round(new_pos.x() / grid_size) * grid_size
-            grid_y = round(new_pos.y() / grid_size) * grid_size
-            
+            grid_x, grid_y = self.grid_cell(value)
             snapped_pos = QPointF(grid_x, grid_y)
             
+            # Most mouse moves of a drag stay within the current grid cell;
+            # that is no move at all, so skip the occupancy check (setPos
+            # then returns without any change notifications)
+            if snapped_pos == self.pos():
+                return snapped_pos
+            
             # Check if this position is occupied by another object (only for Object nodes)
-            if hasattr(self, 'get_text') and self.scene():  # This identifies Object nodes
-                from .object_node import Object
-                for item in self.scene().items():
-                    if isinstance(item, Object) and item != self:
-                        item_pos = item.pos()
-                        # Calculate snapped position for existing item
-                        item_grid_x = round(item_pos.x() / grid_size) * grid_size
-                        item_grid_y = round(item_pos.y() / grid_size) * grid_size
-                        
-                        if item_grid_x == grid_x and item_grid_y == grid_y:
-                            # Position is occupied, return current position (block the move)
-                            return self.pos()
+            scene = self.scene()
+            if hasattr(self, 'get_text') and hasattr(scene, '_objects_by_cell'):  # This identifies Object nodes
+                occupants = scene._objects_by_cell.get((grid_x, grid_y))
+                if occupants and (len(occupants) > 1 or self not in occupants):
+                    # Position is occupied, return current position (block the move)
+                    return self.pos()
             
             return snapped_pos
         elif change == QGraphicsItem.GraphicsItemChange.ItemPositionHasChanged:
+            # Let scene-level geometry caches know something moved
+            scene = self.scene()
+            if scene is not None and hasattr(scene, '_change_counter'):
+                scene._change_counter += 1
+            
+            # Keep the scene's grid index in step with the new position
+            if self in getattr(scene, '_objects', ()) and self.grid_cell(self.pos()) != self._grid_cell:
+                scene._unindex_object(self)
+                scene._index_object(self)
+            
             self.node_moved.emit(self)
             
-            # Update self-loops when an object moves (only for Object nodes)
-            if hasattr(self, 'get_text') and self.scene():
+            # Update self-loops when an object moves (only for Object nodes);
+            # scenes that queue arrow updates already reposition them, once
+            # per event loop pass, from the node_moved signal above
+            if hasattr(self, 'get_text') and scene is not None and not hasattr(scene, 'queue_arrow_update'):
                 # Import here to avoid circular imports
                 from .arrow import Arrow
                 Arrow.update_self_loops_for_node(self)
@@ -98,9 +110,16 @@ class Node(QGraphicsObject):
         self._height = height
         self.update()
     
+    def _invalidate_serialized(self):
+        """Drop the scene's cached session data after a change that it records."""
+        scene = self.scene()
+        if scene is not None and hasattr(scene, '_serialized'):
+            scene._serialized = None
+    
     def set_pen(self, pen):
         """Set the pen for drawing the node."""
         self._pen = pen
+        self._invalidate_serialized()
         self.update()
     
     def set_brush(self, brush):
@@ -110,7 +129,6 @@ class Node(QGraphicsObject):
     
     def mousePressEvent(self, event):
         """Handle mouse press events to start tracking moves."""
-        from PyQt6.QtCore import Qt
         # Accept any mouse button for movement, not just left button
         self._start_position = self.pos()
         self._is_moving = True
@@ -119,31 +137,18 @@ class Node(QGraphicsObject):
     
     def mouseReleaseEvent(self, event):
         """Handle mouse release events to complete move tracking."""
-        from PyQt6.QtCore import Qt
-        print(f"Node mouseReleaseEvent: button={event.button()}, pos={event.pos()}")
-        print(f"Current position: {self.pos()}, start position: {self._start_position}")
-        print(f"Has get_text: {hasattr(self, 'get_text')}")
-        
         if (event.button() == Qt.MouseButton.LeftButton and 
             self._is_moving and 
             self._start_position is not None and 
             hasattr(self, 'get_text')):  # Only for Object nodes, not arrows
             
             end_position = self.pos()
-            print(f"End position: {end_position}")
             if self._start_position != end_position:
-                print("Creating MoveObject command...")
                 # Create move command
                 from core.undo_commands import MoveObject
-                from PyQt6.QtWidgets import QApplication
                 
                 command = MoveObject(self, self._start_position, end_position)
-                app = QApplication.instance()
-                print(f"App has undo_stack: {hasattr(app, 'undo_stack')}")
-                app.undo_stack.push(command)
-                print("Move command pushed to undo stack")
-            else:
-                print("No position change detected")
+                QApplication.instance().undo_stack.push(command)
         
         self._is_moving = False
         self._start_position = None
@@ -160,6 +165,7 @@ class Node(QGraphicsObject):
             # Restore original colors
             self._pen = self._original_pen
             self._brush = self._original_brush
+        self._invalidate_serialized()
         self.update()
     
     def clear_highlight_color(self):
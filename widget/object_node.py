@@ -3,18 +3,23 @@ Object node for DAG diagrams - represents data or process nodes.
 """
 from PyQt6.QtWidgets import QGraphicsItem, QMenu
 from PyQt6.QtCore import QRectF, Qt
-from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QFont, QAction
+from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QFont, QFontMetrics, QAction
 from .node import Node
 
 
 class Object(Node):
     """Object node representing a data or process element in the DAG."""
     
+    # Item type id, as returned by type()
+    Type = QGraphicsItem.UserType + 1
+    
     def __init__(self, text="Object", parent=None):
         super().__init__(parent)
         self._text = text
         self._base_name = text  # Store the original/base name
         self._font = QFont("Arial", 14)  # Normal weight font
+        self._font_metrics = QFontMetrics(self._font)
+        self._bounding_rect = None  # Measured from the text on first use
         self._label_manually_hidden = False  # Manual label hiding flag
         
         # Object-specific styling - transparent background and border
@@ -34,12 +39,12 @@ class Object(Node):
     
     def boundingRect(self):
         """Return the bounding rectangle of the node based on text content."""
-        from PyQt6.QtGui import QFontMetrics
-        from PyQt6.QtCore import QRectF
+        # Qt asks for this on every paint and hit test; set_text resets it
+        if self._bounding_rect is not None:
+            return self._bounding_rect
         
         # Calculate text dimensions using font metrics
-        font_metrics = QFontMetrics(self._font)
-        text_rect = font_metrics.boundingRect(self._text)
+        text_rect = self._font_metrics.boundingRect(self._text)
         
         # Add double padding (2 * pad_size as specified)
         pad_size = 10  # Double the previous padding (was 5)
@@ -51,7 +56,8 @@ class Object(Node):
             w = h
         
         # Return rectangle centered around origin
-        return QRectF(-w/2, -h/2, w, h)
+        self._bounding_rect = QRectF(-w/2, -h/2, w, h)
+        return self._bounding_rect
         
     def paint(self, painter, option, widget=None):
         """Paint the object node."""
@@ -84,6 +90,8 @@ class Object(Node):
         old_text = self._text
         self._text = text
         self.prepareGeometryChange()  # Notify that geometry will change
+        self._bounding_rect = None  # Re-measure the new text
+        self._invalidate_serialized()
         self.update()
         
         # Emit signal if text actually changed
@@ -94,6 +102,7 @@ class Object(Node):
         """Set the base name of the object."""
         old_name = self._base_name
         self._base_name = name
+        self._invalidate_serialized()
         # If no element prefix, also update display text
         if ':' not in self._text:
             self.set_text(name)
@@ -119,7 +128,7 @@ class Object(Node):
     
     def type(self):
         """Return the type identifier for this item."""
-        return QGraphicsItem.UserType + 1
+        return self.Type
     
     def contextMenuEvent(self, event):
         """Handle right-click context menu."""
@@ -1,60 +1,63 @@
 """
 Transparent button panel overlay for displaying proof step buttons.
 """
-from PyQt6.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, QPushButton, 
+from PyQt6.QtWidgets import (QApplication, QWidget, QHBoxLayout, QVBoxLayout, QPushButton, 
                              QGraphicsProxyWidget, QFrame)
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QColor, QPalette, QMouseEvent
+from PyQt6.QtCore import Qt, QEvent, pyqtSignal
+from PyQt6.QtGui import QColor, QPalette, QRegion
+import traceback
 from typing import List, Type
-from core.proof_step import ProofStep
+from core.proof_step import (ProofStep, IdentityProofStep, CompositionProofStep, CancelIdentityProofStep,
+                             TakeKernelProofStep, TakeElementProofStep, MapElementProofStep,
+                             KernelAtElementIsZeroProofStep, CommutesProofStep, CompositionToApplicationProofStep,
+                             ApplicationToKernelIsZeroProofStep, CommutingPathsProofStep, KernelDefinitionProofStep,
+                             SimplifyInclusionProofStep)
 from core.undo_commands import ProofStepCommand
+from .object_node import Object
+from .arrow import Arrow
+
+# Selection states whose applicable proof steps ProofStepButtonPanel remembers
+_APPLICABLE_CACHE_SIZE = 64
+
+
+def _item_state(item):
+    """Return the parts of a selected item that proof step applicability reads."""
+    if hasattr(item, 'get_source'):
+        source, target = item.get_source(), item.get_target()
+        return (id(item), item.get_text(),
+                _item_state(source) if source else None,
+                _item_state(target) if target else None)
+    display_text = item.get_display_text() if hasattr(item, 'get_display_text') else None
+    return (id(item), item.get_text(), display_text)
 
 
 class ProofStepButton(QPushButton):
-    """Custom button for proof steps with enhanced styling."""
+    """Custom button for proof steps, styled by the panel it sits in."""
+    
+    def __init__(self, proof_step_class: Type[ProofStep], scene, objects, arrows, parent=None, button_text=None, panel=None):
+        super().__init__(parent)
+        # The panel whose proof_step_triggered signal a click emits
+        self._panel = panel if panel is not None else parent
+        self.set_proof_step(proof_step_class, scene, objects, arrows, button_text)
+        
+        # Connect click to execute proof step
+        self.clicked.connect(self.execute_proof_step)
     
-    def __init__(self, proof_step_class: Type[ProofStep], scene, objects, arrows, parent=None):
-        button_text = proof_step_class.button_text(objects, arrows)
-        super().__init__(button_text, parent)
+    def set_proof_step(self, proof_step_class: Type[ProofStep], scene, objects, arrows, button_text=None):
+        """Point the button at a proof step for the given selection."""
+        if button_text is None:
+            button_text = proof_step_class.button_text(objects, arrows)
+        self.setText(button_text)
         
         self.proof_step_class = proof_step_class
         self.scene = scene
         self.objects = objects.copy()  # Make a copy to avoid reference issues
         self.arrows = arrows.copy()
-        
-        # Style the button
-        self.setStyleSheet("""
-            QPushButton {
-                background-color: rgba(200, 220, 255, 180);
-                border: 2px solid rgba(100, 150, 200, 200);
-                border-radius: 8px;
-                padding: 8px 16px;
-                font-size: 12px;
-                font-weight: bold;
-                color: rgba(50, 50, 50, 255);
-            }
-            QPushButton:hover {
-                background-color: rgba(220, 240, 255, 220);
-                border: 2px solid rgba(120, 170, 220, 240);
-            }
-            QPushButton:pressed {
-                background-color: rgba(180, 200, 235, 240);
-                border: 2px solid rgba(80, 130, 180, 240);
-            }
-        """)
-        
-        # Connect click to execute proof step
-        self.clicked.connect(self.execute_proof_step)
     
     def execute_proof_step(self):
         """Execute the proof step when button is clicked."""
-        # Find the button panel and emit the signal
-        panel = self.parent()
-        while panel and not hasattr(panel, 'proof_step_triggered'):
-            panel = panel.parent()
-        
-        if panel and hasattr(panel, 'proof_step_triggered'):
-            panel.proof_step_triggered.emit(self.proof_step_class)
+        if self._panel is not None:
+            self._panel.proof_step_triggered.emit(self.proof_step_class)
 
 
 class ProofStepButtonPanel(QFrame):
@@ -66,13 +69,31 @@ class ProofStepButtonPanel(QFrame):
     def __init__(self, parent=None):
         super().__init__(parent)
         
-        # Set up transparent background
+        # Set up transparent background; the button style cascades from here
+        # so it is parsed once rather than once per button
         self.setStyleSheet("""
             QFrame {
                 background-color: rgba(255, 255, 255, 120);
                 border: 1px solid rgba(200, 200, 200, 180);
                 border-radius: 12px;
             }
+            QPushButton {
+                background-color: rgba(200, 220, 255, 180);
+                border: 2px solid rgba(100, 150, 200, 200);
+                border-radius: 8px;
+                padding: 8px 16px;
+                font-size: 12px;
+                font-weight: bold;
+                color: rgba(50, 50, 50, 255);
+            }
+            QPushButton:hover {
+                background-color: rgba(220, 240, 255, 220);
+                border: 2px solid rgba(120, 170, 220, 240);
+            }
+            QPushButton:pressed {
+                background-color: rgba(180, 200, 235, 240);
+                border: 2px solid rgba(80, 130, 180, 240);
+            }
         """)
         
         # Set up layout
@@ -80,41 +101,71 @@ class ProofStepButtonPanel(QFrame):
         self.layout.setContentsMargins(10, 8, 10, 8)
         self.layout.setSpacing(8)
         
-        # Store reference to current buttons
+        # Store reference to current buttons, the visible head of a pool of
+        # buttons that is reused (hidden, not deleted) between selections
         self.current_buttons = []
+        self._button_pool = []
+        
+        # (proof step class, button text) pairs per selection state
+        self._applicable_cache = {}
     
     def update_buttons(self, scene, objects, arrows, available_proof_steps):
         """Update the buttons based on current selection."""
         # Clear existing buttons
         self.clear_buttons()
         
-        # Add new buttons for applicable proof steps
-        for proof_step_class in available_proof_steps:
-            if proof_step_class.is_applicable(objects, arrows):
-                button = ProofStepButton(proof_step_class, scene, objects, arrows, self)
+        # Items added, removed or moved bump the scene's change counter; the
+        # rest of what is_applicable reads comes from the selected items
+        key = (getattr(scene, '_change_counter', None), tuple(available_proof_steps),
+               tuple(map(_item_state, objects)), tuple(map(_item_state, arrows)))
+        applicable = self._applicable_cache.get(key)
+        if applicable is None:
+            applicable = [(proof_step_class, proof_step_class.button_text(objects, arrows))
+                          for proof_step_class in available_proof_steps
+                          if proof_step_class.is_applicable(objects, arrows)]
+            if len(self._applicable_cache) >= _APPLICABLE_CACHE_SIZE:
+                self._applicable_cache.clear()
+            self._applicable_cache[key] = applicable
+        
+        # Show a pooled button for each applicable proof step, growing the pool as needed
+        for index, (proof_step_class, button_text) in enumerate(applicable):
+            if index < len(self._button_pool):
+                button = self._button_pool[index]
+                button.set_proof_step(proof_step_class, scene, objects, arrows, button_text)
+            else:
+                button = ProofStepButton(proof_step_class, scene, objects, arrows, self, button_text, panel=self)
                 self.layout.addWidget(button)
-                self.current_buttons.append(button)
+                self._button_pool.append(button)
+            button.show()
+            self.current_buttons.append(button)
         
         # Show/hide panel based on whether there are buttons
         self.setVisible(len(self.current_buttons) > 0)
     
     def clear_buttons(self):
-        """Remove all buttons from the panel."""
+        """Hide all buttons in the panel, keeping them for reuse."""
         for button in self.current_buttons:
-            self.layout.removeWidget(button)
-            button.deleteLater()
+            button.hide()
         self.current_buttons.clear()
 
 
 class ProofStepOverlay(QWidget):
     """Overlay widget that sits on top of the diagram view."""
     
+    # Proof steps offered in every diagram, then per category kind
+    _BASE_STEPS = (IdentityProofStep, CompositionProofStep, CancelIdentityProofStep, CommutesProofStep,
+                   CompositionToApplicationProofStep, CommutingPathsProofStep, SimplifyInclusionProofStep)
+    _ABELIAN_STEPS = (TakeKernelProofStep, KernelAtElementIsZeroProofStep, ApplicationToKernelIsZeroProofStep,
+                      KernelDefinitionProofStep)
+    _CONCRETE_STEPS = (TakeElementProofStep, MapElementProofStep)
+    
     def __init__(self, diagram_view, parent=None):
         super().__init__(parent)
         self.diagram_view = diagram_view
         self.main_window = self._find_main_window()
         
-        # Don't set transparent for mouse events - we'll handle them manually
+        # The overlay is masked to the button panel (see eventFilter), so mouse
+        # events elsewhere go straight to the view's viewport
         self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, False)
         self.setStyleSheet("background-color: rgba(0, 0, 0, 0);")
         
@@ -130,6 +181,8 @@ class ProofStepOverlay(QWidget):
         layout.addWidget(self.button_panel, alignment=Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignHCenter)
         layout.addStretch()
         
+        self.button_panel.installEventFilter(self)
+        
         # Connect button panel signal
         self.button_panel.proof_step_triggered.connect(self.execute_proof_step)
         
@@ -152,22 +205,19 @@ class ProofStepOverlay(QWidget):
     
     def _get_available_proof_step_classes(self):
         """Get list of available proof step classes."""
-        from core.proof_step import IdentityProofStep, CompositionProofStep, CancelIdentityProofStep, TakeKernelProofStep, TakeElementProofStep, MapElementProofStep, KernelAtElementIsZeroProofStep, CommutesProofStep, CompositionToApplicationProofStep, ApplicationToKernelIsZeroProofStep, CommutingPathsProofStep, KernelDefinitionProofStep, SimplifyInclusionProofStep
+        proof_steps = list(self._BASE_STEPS)
         
-        # Base proof steps
-        proof_steps = [IdentityProofStep, CompositionProofStep, CancelIdentityProofStep, CommutesProofStep, CompositionToApplicationProofStep, CommutingPathsProofStep, SimplifyInclusionProofStep]
+        scene = self.diagram_view.scene()
+        if scene is None:
+            return proof_steps
         
         # Add abelian category specific proof steps
-        if self.diagram_view.scene() and self.diagram_view.scene().is_abelian_category:
-            proof_steps.append(TakeKernelProofStep)
-            proof_steps.append(KernelAtElementIsZeroProofStep)
-            proof_steps.append(ApplicationToKernelIsZeroProofStep)
-            proof_steps.append(KernelDefinitionProofStep)  # Add the new proof step
+        if scene.is_abelian_category:
+            proof_steps.extend(self._ABELIAN_STEPS)
         
         # Add concrete category specific proof steps
-        if self.diagram_view.scene() and self.diagram_view.scene().is_concrete_category:
-            proof_steps.append(TakeElementProofStep)
-            proof_steps.append(MapElementProofStep)
+        if scene.is_concrete_category:
+            proof_steps.extend(self._CONCRETE_STEPS)
         
         return proof_steps
     
@@ -207,6 +257,12 @@ class ProofStepOverlay(QWidget):
         if self.isVisible() and self.diagram_view:
             self.resize(self.diagram_view.size())
     
+    def eventFilter(self, watched, event):
+        """Keep the overlay's mask on the button panel as the panel moves or resizes."""
+        if watched is self.button_panel and event.type() in (QEvent.Type.Move, QEvent.Type.Resize):
+            self.setMask(QRegion(self.button_panel.geometry()))
+        return super().eventFilter(watched, event)
+    
     def execute_proof_step(self, proof_step_class):
         """Execute a proof step using the main window's undo system."""
         if not self.main_window:
@@ -221,25 +277,23 @@ class ProofStepOverlay(QWidget):
         selected_arrows = []
         
         for item in scene.selectedItems():
-            if hasattr(item, 'get_text'):
-                if hasattr(item, 'get_source'):  # It's an arrow
-                    selected_arrows.append(item)
-                else:  # It's an object
-                    selected_objects.append(item)
+            item_type = item.type()
+            if item_type == Object.Type:
+                selected_objects.append(item)
+            elif item_type == Arrow.Type:
+                selected_arrows.append(item)
         
         try:
             # Create proof step instance
             proof_step = proof_step_class(scene, selected_objects, selected_arrows)
             
-            # Import and create the command
-            from core.undo_commands import ProofStepCommand
+            # Create the command
             command = ProofStepCommand(
                 proof_step=proof_step,
                 description=f"Apply {proof_step_class.__name__}"
             )
             
             # Execute via global undo stack
-            from PyQt6.QtWidgets import QApplication
             app = QApplication.instance()
             if hasattr(app, 'undo_stack'):
                 app.undo_stack.push(command)
@@ -253,60 +307,4 @@ class ProofStepOverlay(QWidget):
                 
         except Exception as e:
             print(f"Error executing proof step: {e}")
-            import traceback
             traceback.print_exc()
-    
-    def mousePressEvent(self, event):
-        """Forward mouse events to diagram view if not on button panel."""
-        # Check if the event is on the button panel
-        button_panel_rect = self.button_panel.geometry()
-        if button_panel_rect.contains(event.pos()):
-            # Let the button panel handle it
-            super().mousePressEvent(event)
-        else:
-            # Forward to diagram view - convert QPoint to QPointF
-            from PyQt6.QtCore import QPointF
-            view_pos = QPointF(event.pos())
-            new_event = event.__class__(
-                event.type(),
-                view_pos,
-                event.button(),
-                event.buttons(),
-                event.modifiers()
-            )
-            self.diagram_view.mousePressEvent(new_event)
-    
-    def mouseMoveEvent(self, event):
-        """Forward mouse move events to diagram view if not on button panel."""
-        button_panel_rect = self.button_panel.geometry()
-        if not button_panel_rect.contains(event.pos()):
-            from PyQt6.QtCore import QPointF
-            view_pos = QPointF(event.pos())
-            new_event = event.__class__(
-                event.type(),
-                view_pos,
-                event.button(),
-                event.buttons(),
-                event.modifiers()
-            )
-            self.diagram_view.mouseMoveEvent(new_event)
-        super().mouseMoveEvent(event)
-    
-    def mouseReleaseEvent(self, event):
-        """Forward mouse release events to diagram view if not on button panel."""
-        button_panel_rect = self.button_panel.geometry()
-        if button_panel_rect.contains(event.pos()):
-            # Let the button panel handle it
-            super().mouseReleaseEvent(event)
-        else:
-            # Forward to diagram view
-            from PyQt6.QtCore import QPointF
-            view_pos = QPointF(event.pos())
-            new_event = event.__class__(
-                event.type(),
-                view_pos,
-                event.button(),
-                event.buttons(),
-                event.modifiers()
-            )
-            self.diagram_view.mouseReleaseEvent(new_event)